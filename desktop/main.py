@@ -1,8 +1,201 @@
 # main.py
+import os
+import sys
+import json
+import time
+import atexit
+import shutil
+import socket
+import subprocess
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
 import webview
 
-# Create the window
-webview.create_window("My Streamlit App", "http://localhost:8501", width=1024, height=768)
+# In the one-file PyInstaller build sys.executable is this launcher, not Python,
+# and __file__ points into the temporary unpack directory.
+FROZEN = getattr(sys, "frozen", False)
+
+
+def _default_website() -> str:
+    if FROZEN:
+        # The EXE ships on its own; the website sources sit next to it or one level up
+        base = os.path.dirname(os.path.abspath(sys.executable))
+        candidates = [os.path.join(base, "website", "main.py"), os.path.join(base, "..", "website", "main.py")]
+    else:
+        candidates = [os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "website", "main.py")]
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return os.path.abspath(candidate)
+    return os.path.abspath(candidates[0])
+
+
+# Where the Streamlit app lives (override with AGENT_SUITE_WEBSITE)
+WEBSITE_MAIN = os.environ.get("AGENT_SUITE_WEBSITE") or _default_website()
+OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://localhost:11434").rstrip("/")
+WARMUP_MODELS = ["gemma3"]
+READY_TIMEOUT = 120  # seconds
+
+SPLASH_HTML = """
+<html>
+<body style="font-family: sans-serif; background: #2c3e50; color: #ecf0f1;
+             display: flex; align-items: center; justify-content: center; height: 100vh; margin: 0;">
+  <div style="text-align: center;">
+    <h1>🤖 AI Agent Suite</h1>
+    <p id="status">Starting server…</p>
+  </div>
+</body>
+</html>
+"""
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class LauncherError(RuntimeError):
+    """The server cannot be started; shown on the splash screen instead of retrying."""
+
+
+def _is_launcher(path: str) -> bool:
+    try:
+        return os.path.samefile(path, sys.executable)
+    except OSError:
+        return False
+
+
+def find_python() -> str:
+    """
+    Interpreter to run Streamlit with (override with AGENT_SUITE_PYTHON): the website's
+    virtualenv, then the interpreter running this script, then Python on PATH, whichever
+    first has Streamlit. A frozen launcher is never returned, as it would start another launcher.
+    """
+    if os.environ.get("AGENT_SUITE_PYTHON"):
+        return os.environ["AGENT_SUITE_PYTHON"]
+    website = os.path.dirname(WEBSITE_MAIN)
+    candidates = [
+        os.path.join(website, ".venv", "Scripts", "python.exe"),
+        os.path.join(website, ".venv", "bin", "python"),
+        None if FROZEN else sys.executable,
+        shutil.which("python3"),
+        shutil.which("python"),
+    ]
+    for candidate in candidates:
+        if not candidate or not os.path.isfile(candidate) or (FROZEN and _is_launcher(candidate)):
+            continue
+        check = subprocess.run([candidate, "-c", "import streamlit"], capture_output=True)
+        if check.returncode == 0:
+            return candidate
+    raise LauncherError("No Python with Streamlit installed was found. "
+                        "Run `uv sync` in the website folder or set AGENT_SUITE_PYTHON.")
+
+
+def start_server(port: int) -> subprocess.Popen:
+    """Run the Streamlit app as a managed child process."""
+    if not os.path.isfile(WEBSITE_MAIN):
+        raise LauncherError(f"Website not found at {WEBSITE_MAIN}. Set AGENT_SUITE_WEBSITE.")
+    cmd = [
+        find_python(), "-m", "streamlit", "run", WEBSITE_MAIN,
+        "--server.port", str(port),
+        "--server.address", "127.0.0.1",
+        "--server.headless", "true",
+        "--browser.gatherUsageStats", "false",
+    ]
+    env = dict(os.environ)
+    # Single local user: the Code Inspector may read repositories from their home directory
+    env.setdefault("AGENT_SUITE_REPO_ROOTS", os.path.expanduser("~"))
+    return subprocess.Popen(cmd, cwd=os.path.dirname(WEBSITE_MAIN), env=env)
+
+
+def stop_server(proc: Optional[subprocess.Popen]):
+    if proc is not None and proc.poll() is None:
+        proc.terminate()
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def wait_until_ready(port: int, proc: subprocess.Popen, timeout: float = READY_TIMEOUT) -> bool:
+    """Poll Streamlit's health endpoint until it answers, the server dies, or we time out."""
+    url = f"http://127.0.0.1:{port}/_stcore/health"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(url, timeout=1) as resp:
+                if resp.status == 200:
+                    return True
+        except OSError:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def warm_up(model: str) -> float:
+    """Load a model into Ollama's memory so the first analysis doesn't pay the load time."""
+    started = time.perf_counter()
+    body = json.dumps({"model": model, "keep_alive": "30m"}).encode()
+    req = urllib.request.Request(f"{OLLAMA_HOST}/api/generate", data=body,
+                                 headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=READY_TIMEOUT) as resp:
+            resp.read()
+    except OSError as e:
+        print(f"[Launcher] Could not warm up {model}: {e!r}")
+    return time.perf_counter() - started
+
+
+def set_status(window, text: str):
+    window.evaluate_js(f"document.getElementById('status').textContent = {json.dumps(text)}")
+
+
+def boot(window, proc: subprocess.Popen, port: int, started: float):
+    """Runs after the splash is shown: warm models in parallel, wait for the server, load the UI."""
+    pool = ThreadPoolExecutor(max_workers=len(WARMUP_MODELS))
+    warmups = {model: pool.submit(warm_up, model) for model in WARMUP_MODELS}
+    pool.shutdown(wait=False)
+
+    if not wait_until_ready(port, proc):
+        set_status(window, "The server failed to start. Check the console for details.")
+        return
+    server_ready = time.perf_counter() - started
+    url = f"http://127.0.0.1:{port}"
+    print(f"[Launcher] Server ready in {server_ready:.2f}s")
+
+    def on_loaded():
+        # The splash page fires this event too; only the app page counts
+        if (window.get_current_url() or "").startswith(url):
+            window.events.loaded -= on_loaded
+            print(f"[Launcher] UI ready in {time.perf_counter() - started:.2f}s")
+
+    window.events.loaded += on_loaded
+    window.load_url(url)
+
+    for model, future in warmups.items():
+        print(f"[Launcher] {model} warm after {future.result():.2f}s")
+
+
+def main():
+    started = time.perf_counter()
+    port = free_port()
+    window = webview.create_window("AI Agent Suite", html=SPLASH_HTML, width=1024, height=768)
+    try:
+        proc = start_server(port)
+    except LauncherError as e:
+        print(f"[Launcher] {e}")
+        webview.start(set_status, (window, str(e)))
+        return
+    atexit.register(stop_server, proc)
+
+    window.events.closed += lambda: stop_server(proc)
+    webview.start(boot, (window, proc, port, started))
+    stop_server(proc)
+
 
-# This keeps the window running
-webview.start()
+if __name__ == "__main__":
+    main()
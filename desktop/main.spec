@@ -1,4 +1,6 @@
 # -*- mode: python ; coding: utf-8 -*-
+# Bundles only the launcher. The website folder and its virtualenv stay next to the
+# EXE; main.py finds them at runtime (AGENT_SUITE_WEBSITE / AGENT_SUITE_PYTHON override).
 
 
 a = Analysis(
@@ -1,5 +1,5 @@
 import streamlit as st
-import hashlib
+import time
 from PIL import Image
 from utils import (
     document_qa,
@@ -8,6 +8,9 @@ from utils import (
     resume_parser,
     news_validator,
     code_analyzer,
+    storage,
+    tracing,
+    ui,
 )
 
 # Page configuration & custom CSS
@@ -68,21 +71,16 @@ body {
 st.markdown(custom_css, unsafe_allow_html=True)
 
 # Authentication Handlers
-if 'users' not in st.session_state:
-    st.session_state.users = {}
 if 'auth' not in st.session_state:
     st.session_state.auth = {'logged_in': False, 'user': None}
 
-def hash_password(pw):
-    return hashlib.sha256(pw.encode()).hexdigest()
-
 def login_form():
     st.header("🔑 Login")
     with st.form('login'):
         u = st.text_input('Username')
         pw = st.text_input('Password', type='password')
         if st.form_submit_button('Login'):
-            if u in st.session_state.users and st.session_state.users[u]['password'] == hash_password(pw):
+            if storage.verify_user(u, pw):
                 st.session_state.auth = {'logged_in': True, 'user': u}
                 st.success('Logged in successfully!')
             else:
@@ -94,16 +92,59 @@ def signup_form():
         u = st.text_input('Choose Username')
         pw = st.text_input('Choose Password', type='password')
         if st.form_submit_button('Create Account'):
-            if u in st.session_state.users:
-                st.error('Username already exists')
+            if not u:
+                st.error('Username is required')
             elif len(pw) < 8:
                 st.error('Password must be at least 8 characters')
+            elif not storage.create_user(u, pw):
+                st.error('Username already exists')
             else:
-                st.session_state.users[u] = {'password': hash_password(pw), 'history': []}
                 st.success('Account created! Please login.')
 
 # Pages
 
+HISTORY_AGENTS = {
+    'All': None,
+    'Resume Analyzer': 'resume',
+    'News Validator': 'news',
+    'Code Inspector': 'code',
+    'Document Q&A': 'document_qa',
+    'Email Generator': 'email',
+    'Meeting Scheduler': 'meeting',
+}
+
+def show_history():
+    st.header('🕘 History')
+    user = st.session_state.auth['user']
+    label = st.selectbox('Agent', list(HISTORY_AGENTS.keys()))
+    agent = HISTORY_AGENTS[label]
+
+    # Keyset pagination: a stack of "before" ids, one per visited page
+    if st.session_state.get('history_filter') != label:
+        st.session_state.history_filter = label
+        st.session_state.history_cursors = [None]
+    cursors = st.session_state.history_cursors
+
+    total = storage.count_history(user, agent)
+    rows = storage.get_history(user, agent, storage.DEFAULT_PAGE_SIZE, cursors[-1])
+    st.caption(f'{total} stored analyses · page {len(cursors)}')
+
+    if not rows:
+        st.info('No analyses yet.')
+    for row in rows:
+        with st.expander(f"{row['created_at']} · {row['agent']} · {row['title'] or 'Untitled'}"):
+            st.json(row['result'])
+
+    cols = st.columns(2)
+    with cols[0]:
+        if len(cursors) > 1 and st.button('← Newer'):
+            cursors.pop()
+            st.rerun()
+    with cols[1]:
+        if len(rows) == storage.DEFAULT_PAGE_SIZE and st.button('Older →'):
+            cursors.append(rows[-1]['id'])
+            st.rerun()
+
 def show_about():
     st.title('About AI Agent Suite')
     st.write('Revolutionizing workflows with AI-powered tools.')
@@ -137,23 +178,59 @@ def main_app():
 
     page = st.sidebar.radio('Navigate', [
         'Resume Analyzer', 'News Validator', 'Code Inspector',
-        'Document Q&A', 'Email Generator', 'Meeting Scheduler', 'About'
+        'Document Q&A', 'Email Generator', 'Meeting Scheduler', 'History', 'About'
     ])
 
-    if page == 'Resume Analyzer':
-        resume_parser.show_ui()
-    elif page == 'News Validator':
-        news_validator.show_ui()
-    elif page == 'Code Inspector':
-        code_analyzer.show_ui()
-    elif page == 'Document Q&A':
-        document_qa.show_ui()
-    elif page == 'Email Generator':
-        email_agent.show_ui()
-    elif page == 'Meeting Scheduler':
-        meeting_agent.show_ui()
+    pages = {
+        'Resume Analyzer': resume_parser.show_ui,
+        'News Validator': news_validator.show_ui,
+        'Code Inspector': code_analyzer.show_ui,
+        'Document Q&A': document_qa.show_ui,
+        'Email Generator': email_agent.show_ui,
+        'Meeting Scheduler': meeting_agent.show_ui,
+        'History': show_history,
+    }
+    show_page = pages.get(page, show_about)
+
+    st.sidebar.markdown('---')
+    trace_on = st.sidebar.checkbox('🔬 Trace runs', value=tracing.ENABLED_BY_DEFAULT, key='trace_enabled')
+    profile_on = st.sidebar.checkbox('Sample profile', value=False, key='trace_profile', disabled=not trace_on)
+
+    started = time.perf_counter()
+    if trace_on:
+        # One timeline per rerun; jobs submitted during it keep adding spans
+        trace = tracing.Trace(page, profile=profile_on)
+        with tracing.use(trace), tracing.span('page', page=page):
+            show_page()
+        show_trace_panel(ui.record_trace(trace))
     else:
-        show_about()
+        show_page()
+    show_render_times((time.perf_counter() - started) * 1000)
+
+
+def show_render_times(page_ms):
+    # Full reruns only; fragment reruns update their own captions
+    st.sidebar.caption(f'⏱ Page rendered in {page_ms:.0f} ms')
+    for label, ms in st.session_state.get('render_times', {}).items():
+        st.sidebar.caption(f'· {label}: {ms:.0f} ms')
+
+
+def show_trace_panel(traces):
+    with st.sidebar.expander(f'Traces ({len(traces)})'):
+        for trace in reversed(traces[-5:]):
+            st.markdown(f'**{trace.label}** — {trace.duration_ms():.0f} ms')
+            st.dataframe(
+                {'stage': list(trace.stage_totals().keys()),
+                 'ms': [round(v, 1) for v in trace.stage_totals().values()]},
+                hide_index=True,
+            )
+            hot = trace.hot_functions(5)
+            if hot:
+                st.caption('Hot frames: ' + '; '.join(f'{name} ×{count}' for name, count in hot))
+        st.download_button(
+            'Download Chrome trace', tracing.to_chrome_json(traces),
+            file_name='agent_trace.json', mime='application/json',
+        )
 
 
 def landing_page():
@@ -1,6 +1,11 @@
+import io
+import os
+import zipfile
 import streamlit as st
-from .schemas import CodeAnalysis
-from .ollama_handler import structured_ollama_call
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+from .schemas import CodeAnalysis, FileAnalysis, RepoSummary
+from .ollama_handler import MAX_PARALLEL, structured_ollama_call
+from . import storage, jobs, tracing, ui, code_graph
 
 # Supported file extensions mapped to languages
 EXT_LANG_MAP = {
@@ -11,9 +16,31 @@ EXT_LANG_MAP = {
     "c": "C"
 }
 
+# Repository mode limits
+SKIP_DIRS = {".git", ".hg", ".svn", "node_modules", "__pycache__", "venv", ".venv", "env", "build", "dist", "target"}
+MAX_REPO_FILES = 300
+MAX_REPO_FILE_BYTES = 200_000
+MAX_CONTEXT_MODULES = 8  # imported-module summaries sent with each file
+SUMMARY_CHARS = 300
+# Server directories that may be analyzed by path (os.pathsep separated). Unset means zip
+# uploads only, since any logged-in user could otherwise read the server's files.
+# The desktop launcher sets it to the user's home directory.
+REPO_ROOTS = [
+    os.path.realpath(p) for p in os.environ.get("AGENT_SUITE_REPO_ROOTS", "").split(os.pathsep) if p.strip()
+]
+
+class RepoReport(NamedTuple):
+    name: str
+    summary: RepoSummary
+    files: Dict[str, FileAnalysis]
+    graph: Dict[str, Set[str]]
+    order: List[str]  # completion order; files come after what they import, except within import cycles
+    total: int  # supported files found; more than len(files) when MAX_REPO_FILES cut the list
+
 def analyze_code(code: str, lang: str) -> CodeAnalysis:
     """Call the LLM to analyze code for bugs, security issues, optimizations, and complexity."""
-    prompt = f"""
+    with tracing.span("prompt"):
+        prompt = f"""
 Analyze this {lang} code for bugs, security issues, optimizations, and complexity.
 Return JSON with:
 - overall_score: int
@@ -30,20 +57,213 @@ Code:
         model="gemma3"
     )
 
+def _analyze_job(ctx, user, code: str, lang: str, title: str) -> CodeAnalysis:
+    """Background job: reuse a stored analysis of identical code before calling the LLM."""
+    ctx.progress(0.1, "Analyzing…")
+    result, _ = storage.reuse_or_run(
+        user, "code", storage.hash_input(lang, code),
+        CodeAnalysis, lambda: analyze_code(code, lang), title=title
+    )
+    return result
+
+def submit_analysis(key: str, code: str, lang: str, title: str):
+    """Queue an analysis unless one is already running for this key."""
+    if key in st.session_state.code_jobs:
+        return
+    user = st.session_state.auth['user']
+    st.session_state.code_jobs[key] = jobs.submit(
+        _analyze_job, user, code, lang, title, label=f"Analyze {title}", owner=user
+    )
+
+def language_of(path: str) -> str:
+    return EXT_LANG_MAP.get(path.rsplit(".", 1)[-1], "Unknown")
+
+def _keep(path: str, size: int) -> bool:
+    parts = path.split("/")
+    return (
+        not any(part in SKIP_DIRS for part in parts[:-1])
+        and parts[-1].rsplit(".", 1)[-1] in EXT_LANG_MAP
+        and size <= MAX_REPO_FILE_BYTES
+    )
+
+def _strip_root(files: Dict[str, str]) -> Dict[str, str]:
+    """Drop a top-level folder shared by every file, as GitHub zip downloads have."""
+    roots = {path.split("/", 1)[0] for path in files}
+    if len(roots) == 1 and all("/" in path for path in files):
+        return {path.split("/", 1)[1]: code for path, code in files.items()}
+    return files
+
+def read_zip(data: bytes) -> Tuple[Dict[str, str], int]:
+    """
+    Source files from a zip archive, read in memory without extracting anything.
+    Returns (the first MAX_REPO_FILES files, number of supported files in the archive).
+    """
+    files: Dict[str, str] = {}
+    total = 0
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        for info in zf.infolist():
+            path = info.filename.replace("\\", "/")
+            if info.is_dir() or not _keep(path, info.file_size):
+                continue
+            total += 1
+            if len(files) < MAX_REPO_FILES:
+                files[path] = zf.read(info).decode("utf-8", "ignore")
+    return _strip_root(files), total
+
+def _inside(path: str, root: str) -> bool:
+    try:
+        return os.path.commonpath([path, root]) == root
+    except ValueError:  # different drives on Windows
+        return False
+
+def allowed_directory(folder: str) -> Optional[str]:
+    """The real path of `folder` if it lies inside one of REPO_ROOTS, else None."""
+    real = os.path.realpath(folder)
+    if any(_inside(real, root) for root in REPO_ROOTS):
+        return real
+    return None
+
+def read_directory(root: str) -> Tuple[Dict[str, str], int]:
+    """Like read_zip for a directory; symlinks leading outside it are not followed."""
+    files: Dict[str, str] = {}
+    total = 0
+    for folder, dirs, names in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+        for name in sorted(names):
+            full = os.path.join(folder, name)
+            path = os.path.relpath(full, root).replace(os.sep, "/")
+            if not _inside(os.path.realpath(full), root):
+                continue
+            if not _keep(path, os.path.getsize(full)):
+                continue
+            total += 1
+            if len(files) < MAX_REPO_FILES:
+                with open(full, encoding="utf-8", errors="ignore") as f:
+                    files[path] = f.read()
+    return files, total
+
+def analyze_repo_file(path: str, code: str, lang: str, context: List[Tuple[str, str]]) -> FileAnalysis:
+    """Like analyze_code, with summaries of the repo modules this file imports as context."""
+    with tracing.span("prompt"):
+        imported = "\n".join(f"- {dep}: {summary}" for dep, summary in context) or "None"
+        prompt = f"""
+Analyze this {lang} file from a larger repository for bugs, security issues, optimizations, and complexity.
+Return JSON with:
+- overall_score: int
+- bugs: list of {{description, severity, line_number, fix_suggestion}}
+- optimizations: list of str
+- security_issues: list of str
+- complexity_analysis: dict
+- summary: str (two sentences: what this module does and what it exposes to other files)
+Modules it imports from the same repository:
+{imported}
+File: {path}
+{code}
+"""
+    return structured_ollama_call(
+        prompt=prompt,
+        response_model=FileAnalysis,
+        model="gemma3"
+    )
+
+def summarize_repo(name: str, graph: Dict[str, Set[str]], files: Dict[str, FileAnalysis]) -> RepoSummary:
+    with tracing.span("prompt"):
+        lines = "\n".join(
+            f"- {path} (score {result.overall_score}, {len(result.bugs)} bugs, "
+            f"{len(result.security_issues)} security issues; imports: {', '.join(sorted(graph[path])) or 'none'}): "
+            f"{result.summary[:SUMMARY_CHARS]}"
+            for path, result in files.items()
+        )
+        prompt = f"""
+Summarize the repository "{name}" from these per-file code reviews.
+Return JSON with:
+- overview: str
+- architecture: list of str (main components and how they depend on each other)
+- key_risks: list of str (the most important bugs and security issues across files)
+- overall_score: int
+Files:
+{lines}
+"""
+    return structured_ollama_call(
+        prompt=prompt,
+        response_model=RepoSummary,
+        model="gemma3"
+    )
+
+def _repo_job(ctx, user, name: str, files: Dict[str, str], total: int) -> RepoReport:
+    """
+    Background job: analyze every file once the files it imports are done, so their
+    summaries can be passed along as context, then summarize the whole repository.
+    Per-file results are stored by (path, code, context) hash, so re-running an edited
+    repository only re-analyzes changed files and the files depending on them.
+    """
+    with tracing.span("parse", files=len(files)):
+        graph = code_graph.build_graph(files)
+    results: Dict[str, FileAnalysis] = {}
+    order: List[str] = []
+
+    def work(path: str) -> FileAnalysis:
+        ctx.check()
+        lang, code = language_of(path), files[path]
+        context = [
+            (dep, results[dep].summary[:SUMMARY_CHARS]) for dep in sorted(graph[path]) if dep in results
+        ][:MAX_CONTEXT_MODULES]
+        result, _ = storage.reuse_or_run(
+            user, "code", storage.hash_input("repo", path, lang, code, context),
+            FileAnalysis, lambda: analyze_repo_file(path, code, lang, context), title=f"{name}/{path}"
+        )
+        return result
+
+    def on_result(path: str, result: FileAnalysis):
+        results[path] = result
+        order.append(path)
+        ctx.progress(0.9 * len(results) / len(files), f"{len(results)}/{len(files)} files")
+
+    code_graph.run_in_order(graph, work, MAX_PARALLEL, on_result)
+    ctx.progress(0.95, "Summarizing repository…")
+    ordered = {path: results[path] for path in order}
+    summary, _ = storage.reuse_or_run(
+        user, "code", storage.hash_input("repo-summary", name, [(p, r.model_dump()) for p, r in ordered.items()]),
+        RepoSummary, lambda: summarize_repo(name, graph, ordered), title=name
+    )
+    return RepoReport(name, summary, ordered, graph, order, total)
+
 def show_ui():
     st.header("Code Inspector 🐞")
     st.write("Upload code files or paste code below, then click Analyze to invoke the LLM.")
 
-    # File uploader
-    uploaded_files = st.file_uploader(
-        "Upload Code Files", type=list(EXT_LANG_MAP.keys()), accept_multiple_files=True
-    )
-
     # Prepare session state for contents and results
     if "file_contents" not in st.session_state:
         st.session_state.file_contents = {}  # name -> (lang, code)
     if "code_results" not in st.session_state:
         st.session_state.code_results = {}  # key -> CodeAnalysis
+    if "code_jobs" not in st.session_state:
+        st.session_state.code_jobs = {}  # key -> job id
+
+    if "code_repo_results" not in st.session_state:
+        st.session_state.code_repo_results = {}  # repo key -> RepoReport
+    if "code_repo_jobs" not in st.session_state:
+        st.session_state.code_repo_jobs = {}  # repo key -> job id
+
+    files_tab, repo_tab = st.tabs(["Files", "Repository"])
+    with files_tab:
+        files_panel()
+        st.markdown("---")
+        paste_panel()
+        jobs.show_jobs(st.session_state.code_jobs, st.session_state.code_results)
+        results_panel()
+    with repo_tab:
+        repo_panel()
+        jobs.show_jobs(st.session_state.code_repo_jobs, st.session_state.code_repo_results)
+        repo_results_panel()
+
+@st.fragment
+@ui.traced_fragment("Code files")
+def files_panel():
+    # File uploader
+    uploaded_files = st.file_uploader(
+        "Upload Code Files", type=list(EXT_LANG_MAP.keys()), accept_multiple_files=True
+    )
 
     # Read and store uploaded files
     if uploaded_files:
@@ -55,50 +275,147 @@ def show_ui():
                 code = file.read().decode('utf-8', 'ignore')
                 st.session_state.file_contents[name] = (lang, code)
 
-    # Display uploaded files with analyze buttons
-    for name, (lang, code) in st.session_state.file_contents.items():
+    # Display uploaded files with analyze buttons, one page at a time
+    files = list(st.session_state.file_contents.items())
+    for name, (lang, code) in ui.paginate(files, "code_files"):
         with st.expander(f"{name} ({lang})", expanded=False):
             st.code(code, language=lang.lower())
             analyze_btn = st.button(f"Analyze {name}", key=f"analyze_{name}")
             if analyze_btn:
-                with st.spinner(f"Analyzing {name}…"):
-                    st.session_state.code_results[name] = analyze_code(code, lang)
+                submit_analysis(name, code, lang, name)
+                st.rerun()
 
+@st.fragment
+@ui.traced_fragment("Code paste")
+def paste_panel():
     # Text area fallback
-    st.markdown("---")
     code_fallback = st.text_area("Or paste code here", height=200)
     fallback_lang = st.selectbox("Language for pasted code", list(EXT_LANG_MAP.values()), key="fallback_lang")
     analyze_paste = st.button("Analyze Pasted Code")
     if analyze_paste and code_fallback.strip():
         key = f"Pasted::{fallback_lang}" + code_fallback[:30]
-        with st.spinner("Analyzing pasted code…"):
-            st.session_state.code_results[key] = analyze_code(code_fallback, fallback_lang)
-
-    # Display results
-    for key, result in st.session_state.code_results.items():
-        title = key if not key.startswith("Pasted::") else "Pasted Code"
-        with st.expander(f"Results: {title}", expanded=True):
-            tabs = st.tabs(["Overview", "Bugs", "Optimizations", "Security", "Complexity"])
-            with tabs[0]:
-                st.metric("Overall Score", f"{result.overall_score}/100")
-            with tabs[1]:
-                if result.bugs:
-                    for bug in result.bugs:
-                        st.markdown(
-                            f"### 🐞 {bug.description}\n**Severity:** {bug.severity}  \n**Line:** {bug.line_number or 'N/A'}  \n**Fix:** {bug.fix_suggestion}"
-                        )
-                else:
-                    st.write("No bugs detected.")
-            with tabs[2]:
-                st.write("No optimizations suggested." if not result.optimizations else "")
-                for opt in result.optimizations or []:
-                    st.markdown(f"- 🚀 {opt}")
-            with tabs[3]:
-                st.write("No security issues found." if not result.security_issues else "")
-                for sec in result.security_issues or []:
-                    st.markdown(f"- 🔒 {sec}")
-            with tabs[4]:
-                st.json(result.complexity_analysis)
-            st.markdown("---")
+        submit_analysis(key, code_fallback, fallback_lang, "Pasted Code")
+        st.rerun()
+
+@st.fragment
+@ui.traced_fragment("Code results")
+def results_panel():
+    results = st.session_state.code_results
+    with tracing.span("render", items=len(results)), ui.render_timer("Code results"):
+        # Newest first; only the current page is rendered
+        for key, result in ui.paginate(list(results.items())[::-1], "code_results"):
+            render_result(key, result)
+
+def render_result(key: str, result: CodeAnalysis):
+    title = key if not key.startswith("Pasted::") else "Pasted Code"
+    with st.expander(f"Results: {title}", expanded=True):
+        ui.repair_notice(result)
+        tabs = st.tabs(["Overview", "Bugs", "Optimizations", "Security", "Complexity"])
+        with tabs[0]:
+            st.metric("Overall Score", f"{result.overall_score}/100")
+        with tabs[1]:
+            if result.bugs:
+                for bug in result.bugs:
+                    st.markdown(
+                        f"### 🐞 {bug.description}\n**Severity:** {bug.severity}  \n**Line:** {bug.line_number or 'N/A'}  \n**Fix:** {bug.fix_suggestion}"
+                    )
+            else:
+                st.write("No bugs detected.")
+        with tabs[2]:
+            st.write("No optimizations suggested." if not result.optimizations else "")
+            for opt in result.optimizations or []:
+                st.markdown(f"- 🚀 {opt}")
+        with tabs[3]:
+            st.write("No security issues found." if not result.security_issues else "")
+            for sec in result.security_issues or []:
+                st.markdown(f"- 🔒 {sec}")
+        with tabs[4]:
+            st.json(result.complexity_analysis)
+        st.markdown("---")
 
+@st.fragment
+@ui.traced_fragment("Repository input")
+def repo_panel():
+    st.caption(f"Upload a zip{' or enter a local folder' if REPO_ROOTS else ''}. Up to {MAX_REPO_FILES} "
+               f"{'/'.join(EXT_LANG_MAP)} files are analyzed in import order.")
+    archive = st.file_uploader("Repository zip", type=["zip"])
+    folder = ""
+    if REPO_ROOTS:
+        folder = st.text_input("Or a directory on this machine", placeholder=REPO_ROOTS[0])
+    if not st.button("Analyze Repository"):
+        return
+    try:
+        if archive:
+            name = archive.name.rsplit(".", 1)[0]
+            files, total = read_zip(archive.getvalue())
+        elif folder.strip():
+            root = allowed_directory(folder.strip())
+            if root is None:
+                st.error(f"Only directories under {', '.join(REPO_ROOTS)} can be analyzed.")
+                return
+            if not os.path.isdir(root):
+                st.error(f"Not a directory: {folder}")
+                return
+            name = os.path.basename(root)
+            files, total = read_directory(root)
+        else:
+            st.warning("Upload a zip or enter a directory first.")
+            return
+    except (zipfile.BadZipFile, OSError, ValueError) as e:
+        st.error(f"Could not read repository: {e}")
+        return
+    if not files:
+        st.warning("No supported source files found.")
+        return
 
+    key = storage.hash_input(name, sorted(files.items()))
+    if key not in st.session_state.code_repo_jobs:
+        user = st.session_state.auth['user']
+        st.session_state.code_repo_jobs[key] = jobs.submit(
+            _repo_job, user, name, files, total, label=f"Analyze {name} ({len(files)} files)", owner=user
+        )
+    st.rerun()
+
+@st.fragment
+@ui.traced_fragment("Repository reports")
+def repo_results_panel():
+    reports = st.session_state.code_repo_results
+    with tracing.span("render", items=len(reports)), ui.render_timer("Repository reports"):
+        for key, report in list(reports.items())[::-1]:
+            render_repo(key, report)
+
+def render_repo(key: str, report: RepoReport):
+    summary = report.summary
+    st.subheader(f"📦 {report.name}")
+    if report.total > len(report.files):
+        st.warning(f"Only the first {len(report.files)} of {report.total} supported files were analyzed "
+                   f"(limit {MAX_REPO_FILES}).")
+    ui.repair_notice(summary)
+    cols = st.columns(3)
+    cols[0].metric("Overall Score", f"{summary.overall_score}/100")
+    cols[1].metric("Files", len(report.files))
+    cols[2].metric("Import edges", sum(len(deps) for deps in report.graph.values()))
+    st.write(summary.overview)
+    if summary.architecture:
+        st.markdown("**Architecture**")
+        for item in summary.architecture:
+            st.markdown(f"- 🧩 {item}")
+    if summary.key_risks:
+        st.markdown("**Key Risks**")
+        for risk in summary.key_risks:
+            st.markdown(f"- ⚠️ {risk}")
+    st.dataframe(
+        {
+            "File": report.order,
+            "Language": [language_of(p) for p in report.order],
+            "Score": [report.files[p].overall_score for p in report.order],
+            "Bugs": [len(report.files[p].bugs) for p in report.order],
+            "Security": [len(report.files[p].security_issues) for p in report.order],
+            "Imports": [", ".join(sorted(report.graph[p])) for p in report.order],
+        },
+        hide_index=True,
+    )
+    for path in ui.paginate(report.order, f"repo_{key}"):
+        result = report.files[path]
+        st.caption(f"{path}: {result.summary}")
+        render_result(path, result)
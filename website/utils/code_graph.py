@@ -0,0 +1,225 @@
+# utils/code_graph.py
+import posixpath
+import re
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+# Import statements per file extension; only imports that resolve to repo files count
+PY_IMPORT = re.compile(r"^[ \t]*import[ \t]+([\w., \t]+)", re.M)
+PY_FROM = re.compile(r"^[ \t]*from[ \t]+(\.*)([\w.]*)[ \t]+import[ \t]+(\([^)]*\)|[^\n#]+)", re.M)
+JS_IMPORT = re.compile(
+    r"""(?:\b(?:import|export)\b[^'"`;]*?\bfrom\s*|\bimport\s*\(?\s*|\brequire\s*\(\s*)['"]([^'"]+)['"]"""
+)
+C_INCLUDE = re.compile(r'^[ \t]*#[ \t]*include[ \t]*"([^"]+)"', re.M)
+JAVA_IMPORT = re.compile(r"^[ \t]*import[ \t]+(?:static[ \t]+)?([\w.]+?)(\.\*)?[ \t]*;", re.M)
+
+
+def _ext(path: str) -> str:
+    return path.rsplit(".", 1)[-1] if "." in path else ""
+
+
+def _closest(candidates: Set[str], importer: str) -> str:
+    """Among same-named files prefer the one sharing the longest directory prefix."""
+    return max(sorted(candidates), key=lambda c: len(posixpath.commonprefix([c, importer])))
+
+
+class _Index:
+    """Lookup tables from module names, dotted path suffixes and file stems to repo paths."""
+
+    def __init__(self, paths: List[str]):
+        self.paths = set(paths)
+        self.dotted: Dict[Tuple[str, str], Set[str]] = defaultdict(set)  # ("py", "pkg.mod") -> paths
+        self.packages: Dict[str, Set[str]] = defaultdict(set)            # "com.acme" -> java files
+        self.stems: Dict[str, Set[str]] = defaultdict(set)               # "util" -> c/cpp files
+        for path in paths:
+            ext = _ext(path)
+            parts = path[:-len(ext) - 1].split("/")
+            if ext == "py" and parts[-1] == "__init__":
+                parts = parts[:-1]
+            for i in range(len(parts)):
+                self.dotted[(ext, ".".join(parts[i:]))].add(path)
+            if ext == "java":
+                for i in range(len(parts) - 1):
+                    self.packages[".".join(parts[i:-1])].add(path)
+            if ext in ("c", "cpp"):
+                self.stems[parts[-1]].add(path)
+
+    def module(self, ext: str, name: str, importer: str) -> Set[str]:
+        found = self.dotted.get((ext, name))
+        return {_closest(found, importer)} if found else set()
+
+
+def _python_deps(path: str, code: str, index: _Index) -> Set[str]:
+    deps: Set[str] = set()
+    package = path[:-3].split("/")[:-1]
+    for match in PY_IMPORT.finditer(code):
+        for item in match.group(1).split(","):
+            name = item.split()[0] if item.split() else ""
+            # "import a.b.c" also loads a and a.b; the deepest repo module is the real dependency
+            while name and not (found := index.module("py", name, path)):
+                name = name.rpartition(".")[0]
+            if name:
+                deps |= found
+    for match in PY_FROM.finditer(code):
+        dots, base, names = match.groups()
+        if dots:
+            parent = package[:len(package) - len(dots) + 1]
+            base = ".".join(parent + ([base] if base else []))
+        hits: Set[str] = set()
+        for name in names.strip("()").replace("\n", " ").split(","):
+            name = name.split()[0] if name.split() else ""
+            if name and name != "*":
+                hits |= index.module("py", f"{base}.{name}" if base else name, path)
+        deps |= hits or (index.module("py", base, path) if base else set())
+    return deps
+
+
+def _js_deps(path: str, code: str, index: _Index) -> Set[str]:
+    deps: Set[str] = set()
+    for spec in JS_IMPORT.findall(code):
+        if not spec.startswith("."):  # packages from node_modules are not part of the repo
+            continue
+        target = posixpath.normpath(posixpath.join(posixpath.dirname(path), spec))
+        for candidate in (target, f"{target}.js", f"{target}/index.js"):
+            if candidate in index.paths:
+                deps.add(candidate)
+                break
+    return deps
+
+
+def _c_deps(path: str, code: str, index: _Index) -> Set[str]:
+    # Headers are not analyzed; an include stands for the .c/.cpp file implementing it
+    deps: Set[str] = set()
+    for header in C_INCLUDE.findall(code):
+        stem = posixpath.splitext(posixpath.basename(header))[0]
+        found = index.stems.get(stem, set()) - {path}
+        if found:
+            deps.add(_closest(found, path))
+    return deps
+
+
+def _java_deps(path: str, code: str, index: _Index) -> Set[str]:
+    deps: Set[str] = set()
+    for name, wildcard in JAVA_IMPORT.findall(code):
+        if wildcard:
+            deps |= index.packages.get(name, set())
+            continue
+        # static imports name a member; drop trailing parts until a class file matches
+        while name and not (found := index.module("java", name, path)):
+            name = name.rpartition(".")[0]
+        if name:
+            deps |= found
+    return deps
+
+
+DEPENDENCY_PARSERS = {
+    "py": _python_deps,
+    "js": _js_deps,
+    "c": _c_deps,
+    "cpp": _c_deps,
+    "java": _java_deps,
+}
+
+
+def build_graph(files: Dict[str, str]) -> Dict[str, Set[str]]:
+    """Map every file to the repo files it imports."""
+    index = _Index(list(files))
+    graph: Dict[str, Set[str]] = {}
+    for path, code in files.items():
+        parse = DEPENDENCY_PARSERS.get(_ext(path))
+        graph[path] = (parse(path, code, index) if parse else set()) - {path}
+    return graph
+
+
+def components(graph: Dict[str, Set[str]]) -> Dict[str, int]:
+    """Strongly connected component id of every file (Tarjan's algorithm, iterative)."""
+    index: Dict[str, int] = {}
+    low: Dict[str, int] = {}
+    comp: Dict[str, int] = {}
+    stack: List[str] = []
+    on_stack: Set[str] = set()
+    counter = 0
+    for root in sorted(graph):
+        if root in index:
+            continue
+        work = [(root, iter(sorted(graph[root])))]
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, children = work[-1]
+            child = next(children, None)
+            if child is not None:
+                if child not in graph:
+                    continue
+                if child not in index:
+                    index[child] = low[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(sorted(graph[child]))))
+                elif child in on_stack:
+                    low[node] = min(low[node], index[child])
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index[node]:
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    comp[member] = index[node]
+                    if member == node:
+                        break
+    return comp
+
+
+def run_in_order(graph: Dict[str, Set[str]], work: Callable[[str], Any], max_workers: int,
+                 on_result: Callable[[str, Any], None]):
+    """
+    Run work(path) for every file, each as soon as the files it imports have finished,
+    at most max_workers at a time. on_result(path, result) runs in the calling thread.
+    When everything left is blocked, an import cycle is broken inside a component whose
+    files wait only on each other, starting the one with the fewest unfinished imports;
+    files that merely import a cycle keep waiting for it.
+    """
+    comp = components(graph)
+    waiting = {path: set(deps) for path, deps in graph.items()}
+    dependents: Dict[str, Set[str]] = defaultdict(set)
+    for path, deps in graph.items():
+        for dep in deps:
+            dependents[dep].add(path)
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="code-graph") as pool:
+        running = {}
+
+        def start_ready():
+            ready = sorted(path for path, deps in waiting.items() if not deps)
+            if not ready and not running and waiting:
+                blocked = [
+                    path for path in waiting
+                    if all(comp[dep] == comp[path] for dep in waiting[path])
+                ]
+                ready = [min(blocked, key=lambda path: (len(waiting[path]), path))]
+            for path in ready:
+                del waiting[path]
+                running[pool.submit(work, path)] = path
+
+        start_ready()
+        try:
+            while running:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    path = running.pop(future)
+                    on_result(path, future.result())
+                    for dependent in dependents[path]:
+                        if dependent in waiting:
+                            waiting[dependent].discard(path)
+                start_ready()
+        except BaseException:
+            for future in running:
+                future.cancel()
+            raise
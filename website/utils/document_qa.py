@@ -1,21 +1,34 @@
 # utils/document_qa.py
+import codecs
 import streamlit as st
 import PyPDF2
 from docx import Document
-from io import BytesIO
 from .schemas import QAResponse
 from .ollama_handler import structured_ollama_call
-from typing import Union
+from . import storage, tracing, ui
+from .qa_cache import QACache, document_hash
+from typing import Iterator, List
 
-def parse_document(file: Union[bytes, str]) -> str:
+# Extraction budget and upload limits
+MAX_CHARS = 5000
+MAX_UPLOAD_BYTES = 5 * 1024 * 1024
+TXT_CHUNK_BYTES = 64 * 1024
+
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+@tracing.traced("parse")
+def parse_document(file, budget: int = MAX_CHARS) -> str:
     """Parse different document formats with error handling and text normalization"""
     try:
+        if file.size > MAX_UPLOAD_BYTES:
+            st.error(f"File too large: {file.size / 1e6:.1f}MB (max {MAX_UPLOAD_BYTES // (1024 * 1024)}MB)")
+            return ""
         if file.type == "application/pdf":
-            return parse_pdf(file)
+            return parse_pdf(file, budget)
         elif file.type == "text/plain":
-            return parse_txt(file)
-        elif file.type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-            return parse_docx(file)
+            return parse_txt(file, budget)
+        elif file.type == DOCX_TYPE:
+            return parse_docx(file, budget)
         else:
             st.error(f"Unsupported file format: {file.type}")
             return ""
@@ -23,36 +36,86 @@ def parse_document(file: Union[bytes, str]) -> str:
         st.error(f"Error parsing document: {str(e)}")
         return ""
 
-def parse_pdf(file) -> str:
-    """Extract text from PDF with page normalization"""
-    pdf = PyPDF2.PdfReader(BytesIO(file.getvalue()))
-    text = []
-    for page in pdf.pages:
-        page_text = page.extract_text() or ""
-        # Normalize whitespace and clean text
-        text.append(" ".join(page_text.replace("\n", " ").split()))
-    return " ".join(text)[:5000]  # Truncate to 5000 chars
-
-def parse_docx(file) -> str:
-    """Extract text from DOCX with paragraph joining"""
-    doc = Document(BytesIO(file.getvalue()))
-    return "\n".join([
-        " ".join(para.text.replace("\n", " ").split())
-        for para in doc.paragraphs
-        if para.text.strip()
-    ])[:5000]
-
-def parse_txt(file) -> str:
-    """Read and clean text from TXT file"""
+def take_budget(pieces: Iterator[str], budget: int, sep: str = " ") -> str:
+    """
+    Normalize and join text pieces until the character budget is met.
+    Stops pulling from the iterator as soon as it is, so later pages are never decoded.
+    """
+    out: List[str] = []
+    size = 0
     try:
-        text = file.getvalue().decode("utf-8")
-    except UnicodeDecodeError:
-        text = file.getvalue().decode("latin-1")
-    return " ".join(text.replace("\n", " ").split())[:5000]
+        for piece in pieces:
+            piece = " ".join(piece.split())
+            if not piece:
+                continue
+            out.append(piece)
+            size += len(piece) + len(sep)
+            if size >= budget:
+                break
+    finally:
+        if hasattr(pieces, "close"):
+            pieces.close()
+    return sep.join(out)[:budget]
+
+def _rewound(file):
+    """The upload itself as a stream, read in place rather than copied."""
+    file.seek(0)
+    return file
+
+def iter_pdf_pages(file) -> Iterator[str]:
+    pdf = PyPDF2.PdfReader(_rewound(file))
+    for page in pdf.pages:
+        yield page.extract_text() or ""
+
+def iter_docx_paragraphs(file) -> Iterator[str]:
+    doc = Document(_rewound(file))
+    for para in doc.paragraphs:
+        yield para.text
+
+def _decoder(encoding: str):
+    return codecs.getincrementaldecoder(encoding)()
+
+def iter_txt_words(file, chunk_size: int = TXT_CHUNK_BYTES, limit: int = MAX_CHARS) -> Iterator[str]:
+    """
+    Whitespace-separated words of a text upload, decoded chunk by chunk.
+    A character or word split across chunks is carried over whole; once a chunk is
+    not valid UTF-8 the rest of the file is read as latin-1.
+    """
+    decoder = _decoder("utf-8")
+    tail = ""
+    with file.getbuffer() as view:
+        for start in range(0, len(view) + 1, chunk_size):
+            chunk = view[start:start + chunk_size]
+            final = start + chunk_size > len(view)
+            pending = decoder.getstate()[0]
+            try:
+                text = decoder.decode(chunk, final)
+            except UnicodeDecodeError:
+                decoder = _decoder("latin-1")
+                text = decoder.decode(pending + chunk, final)
+            words = (tail + text).split()
+            tail = words.pop() if words and not final and not text[-1:].isspace() else ""
+            yield from words
+            if len(tail) >= limit:  # a single word fills the budget on its own
+                yield tail
+                return
+
+def parse_pdf(file, budget: int = MAX_CHARS) -> str:
+    """Extract text from PDF page by page, stopping once the budget is met"""
+    return take_budget(iter_pdf_pages(file), budget)
+
+def parse_docx(file, budget: int = MAX_CHARS) -> str:
+    """Extract text from DOCX with paragraph joining, stopping once the budget is met"""
+    return take_budget(iter_docx_paragraphs(file), budget, sep="\n")
+
+def parse_txt(file, budget: int = MAX_CHARS) -> str:
+    """Read and clean text from TXT file, stopping once the budget is met"""
+    return take_budget(iter_txt_words(file, limit=budget), budget)
 
 def analyze_document(text: str, question: str) -> QAResponse:
     """Analyze document content with context-aware prompting"""
-    prompt = f"""
+    with tracing.span("prompt"):
+        prompt = f"""
     Answer this question based EXCLUSIVELY on the provided document content.
     If the answer isn't found, state that clearly.
     
@@ -82,11 +145,20 @@ def show_ui():
     
     if doc:
         with st.expander("Preview First 500 Characters"):
-            text_preview = parse_document(doc)[:500]
+            text_preview = parse_document(doc, budget=500)
             st.write(text_preview + "..." if len(text_preview) == 500 else text_preview)
     
+    if "qa_cache" not in st.session_state:
+        st.session_state.qa_cache = QACache()
+
+    qa_panel(doc)
+
+@st.fragment
+@ui.traced_fragment("Document question")
+def qa_panel(doc):
+    """Asking a new question reruns only this panel; the upload and preview stay put."""
     question = st.text_input("Ask about the document", placeholder="What is the main purpose of this document?")
-    
+
     if doc and question:
         with st.spinner("Analyzing document..."):
             text = parse_document(doc)
@@ -94,9 +166,22 @@ def show_ui():
                 st.error("Failed to extract text from document")
                 return
             
-            result = analyze_document(text, question)
+            # Reuse answers to equivalent questions about the same document version
+            cache = st.session_state.qa_cache.for_document(doc.name, document_hash(text))
+            hit = cache.lookup(question)
+            if hit:
+                result, matched, score = hit
+                st.caption(f"♻️ Reused answer to \"{matched}\" ({score:.0%} similar)")
+            else:
+                result, _ = storage.reuse_or_run(
+                    st.session_state.auth['user'], "document_qa", storage.hash_input(text, question),
+                    QAResponse, lambda: analyze_document(text, question), title=f"{doc.name}: {question}"
+                )
+                if not result.has_placeholders:
+                    cache.add(question, result)
             
             st.subheader("Answer")
+            ui.repair_notice(result)
             st.markdown(f"**{result.answer}**")
             st.progress(result.confidence/100)
             
@@ -1,37 +1,184 @@
 # utils/email_agent.py
+import io
+import csv
+import zipfile
 import streamlit as st
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List
 from .schemas import EmailContent
-from .ollama_handler import structured_ollama_call
+from .ollama_handler import MAX_PARALLEL, structured_ollama_call
+from . import storage, jobs, tracing, ui
+
+# Shared instructions come first so Ollama can reuse the cached prompt prefix across a batch
+PROMPT_PREFIX = """
+    Generate professional email with these requirements:
+    - Tone: {tone}
+    - Language: {lang}
+    - Purpose: {purpose}
+"""
+
+BATCH_COLUMNS = ["recipient", "email", "subject", "body", "tone_score", "clarity_score"]
 
 def show_ui():
     st.header("Email Generator 📧")
-    
+
     col1, col2 = st.columns(2)
     with col1:
         tone = st.selectbox("Tone Style", ["Formal", "Casual", "Persuasive", "Friendly"])
-        key_points = st.text_area("Key Points", height=150)
     with col2:
         language = st.selectbox("Language", ["English", "Spanish", "French", "German"])
         purpose = st.text_input("Email Purpose")
-    
-    if st.button("Generate Email"):
-        result = generate_email(tone, key_points, purpose, language)
-        
-        st.subheader("Generated Email")
-        st.markdown(f"**Subject:** {result.subject}")
-        st.markdown(result.body)
-        st.download_button("Download Email", result.body, file_name="generated_email.txt")
-
-def generate_email(tone: str, points: str, purpose: str, lang: str) -> EmailContent:
-    prompt = f"""
-    Generate professional email with these requirements:
-    - Tone: {tone}
-    - Language: {lang}
-    - Purpose: {purpose}
-    - Key points: {points}
-    """
+
+    single_tab, batch_tab = st.tabs(["Single Email", "Mail Merge"])
+    with single_tab:
+        key_points = st.text_area("Key Points", height=150)
+        if st.button("Generate Email"):
+            result, _ = storage.reuse_or_run(
+                st.session_state.auth['user'], "email", storage.hash_input(tone, key_points, purpose, language),
+                EmailContent, lambda: generate_email(tone, key_points, purpose, language), title=purpose
+            )
+
+            st.subheader("Generated Email")
+            ui.repair_notice(result)
+            st.markdown(f"**Subject:** {result.subject}")
+            st.markdown(result.body)
+            st.download_button("Download Email", result.body, file_name="generated_email.txt")
+    with batch_tab:
+        show_batch_ui(tone, purpose, language)
+
+@tracing.traced("prompt")
+def build_prompt(tone: str, points: str, purpose: str, lang: str, recipient: str = "") -> str:
+    prompt = PROMPT_PREFIX.format(tone=tone, lang=lang, purpose=purpose)
+    if recipient:
+        prompt += f"    - Recipient: {recipient}\n"
+    return prompt + f"    - Key points: {points}\n    "
+
+def generate_email(tone: str, points: str, purpose: str, lang: str, recipient: str = "") -> EmailContent:
     return structured_ollama_call(
-        prompt=prompt,
+        prompt=build_prompt(tone, points, purpose, lang, recipient),
         response_model=EmailContent,
         model="gemma3"
-    )
\ No newline at end of file
+    )
+
+# Mail merge
+
+def read_recipients(file) -> List[Dict[str, str]]:
+    """
+    Read a recipient CSV. Requires 'name' and 'key_points' columns; 'email' and any
+    other columns are optional and passed to the model as recipient details.
+    """
+    text = file.getvalue().decode("utf-8-sig", "replace")
+    reader = csv.DictReader(io.StringIO(text))
+    fields = [f.strip().lower() for f in reader.fieldnames or []]
+    missing = {"name", "key_points"} - set(fields)
+    if missing:
+        raise ValueError(f"CSV is missing column(s): {', '.join(sorted(missing))}")
+    rows = []
+    for raw in reader:
+        row = {k.strip().lower(): (v or "").strip() for k, v in raw.items() if k}
+        if row.get("name") or row.get("key_points"):
+            rows.append(row)
+    return rows
+
+def describe_recipient(row: Dict[str, str]) -> str:
+    extras = [f"{k}: {v}" for k, v in row.items() if k not in ("name", "key_points", "email") and v]
+    return ", ".join([row.get("name", "")] + extras)
+
+def _email_row(user, row: Dict[str, str], tone: str, purpose: str, lang: str) -> EmailContent:
+    recipient = describe_recipient(row)
+    points = row.get("key_points", "")
+    result, _ = storage.reuse_or_run(
+        user, "email", storage.hash_input(tone, points, purpose, lang, recipient),
+        EmailContent, lambda: generate_email(tone, points, purpose, lang, recipient),
+        title=f"{purpose} → {row.get('name', '')}"
+    )
+    return result
+
+def _batch_job(ctx, user, rows: List[Dict[str, str]], done: Dict[int, EmailContent],
+               tone: str, purpose: str, lang: str) -> Dict[int, EmailContent]:
+    """
+    Background job: generate one email per row, as many at a time as Ollama allows.
+    Finished rows land in `done` as they complete. Rows already in `done`, or generated
+    by an earlier run with identical inputs, are not sent to the LLM again.
+    """
+    todo = [i for i in range(len(rows)) if i not in done]
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL, thread_name_prefix="mail-merge") as pool:
+        futures = {pool.submit(_email_row, user, rows[i], tone, purpose, lang): i for i in todo}
+        try:
+            for future in as_completed(futures):
+                done[futures[future]] = future.result()
+                ctx.progress(len(done) / len(rows), f"{len(done)}/{len(rows)} emails")
+        except jobs.JobCancelled:
+            for future in futures:
+                future.cancel()
+            raise
+    return done
+
+def batch_csv(rows: List[Dict[str, str]], done: Dict[int, EmailContent]) -> str:
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=BATCH_COLUMNS)
+    writer.writeheader()
+    for i in sorted(done):
+        email = done[i]
+        writer.writerow({
+            "recipient": rows[i].get("name", ""),
+            "email": rows[i].get("email", ""),
+            "subject": email.subject,
+            "body": email.body,
+            "tone_score": email.tone_score,
+            "clarity_score": email.clarity_score,
+        })
+    return out.getvalue()
+
+def batch_zip(rows: List[Dict[str, str]], done: Dict[int, EmailContent]) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i in sorted(done):
+            name = "".join(c if c.isalnum() else "_" for c in rows[i].get("name", "")) or "recipient"
+            email = done[i]
+            zf.writestr(f"{i + 1:04d}_{name}.txt", f"To: {rows[i].get('email', '')}\nSubject: {email.subject}\n\n{email.body}\n")
+    return buf.getvalue()
+
+def _batch_downloads():
+    batch = st.session_state.email_batch
+    rows, done = batch["rows"], batch["done"]
+    st.write(f"**{len(done)}/{len(rows)}** emails ready")
+    if done:
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("Download CSV", batch_csv(rows, done), file_name="mail_merge.csv", mime="text/csv")
+        with col2:
+            st.download_button("Download ZIP", batch_zip(rows, done), file_name="mail_merge.zip", mime="application/zip")
+
+def show_batch_ui(tone: str, purpose: str, language: str):
+    st.write("Upload a CSV with `name` and `key_points` columns (optional `email` and any extra details).")
+    file = st.file_uploader("Recipients CSV", type=["csv"])
+
+    if "email_batch_jobs" not in st.session_state:
+        st.session_state.email_batch_jobs = {}
+    if "email_batch_results" not in st.session_state:
+        st.session_state.email_batch_results = {}
+
+    if file and st.button("Generate Emails", disabled=bool(st.session_state.email_batch_jobs)):
+        try:
+            rows = read_recipients(file)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        batch_key = storage.hash_input(tone, purpose, language, file.getvalue())
+        batch = st.session_state.get("email_batch")
+        # Same table and settings: resume, keeping rows that already finished
+        if batch is None or batch["key"] != batch_key:
+            batch = {"key": batch_key, "rows": rows, "done": {}}
+            st.session_state.email_batch = batch
+        user = st.session_state.auth['user']
+        st.session_state.email_batch_jobs["batch"] = jobs.submit(
+            _batch_job, user, batch["rows"], batch["done"], tone, purpose, language,
+            label=f"Mail merge ({len(rows)} recipients)", owner=user
+        )
+
+    jobs.show_jobs(st.session_state.email_batch_jobs, st.session_state.email_batch_results)
+    if st.session_state.get("email_batch"):
+        # Keep refreshing the downloads while the batch is still running
+        running = bool(st.session_state.email_batch_jobs)
+        st.fragment(_batch_downloads, run_every=2.0 if running else None)()
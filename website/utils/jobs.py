@@ -0,0 +1,195 @@
+# utils/jobs.py
+import time
+import uuid
+import threading
+import contextvars
+import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+from . import tracing
+
+# LLM calls are network-bound, so threads are enough; size this to Ollama's parallelism
+MAX_WORKERS = 4
+# Finished jobs nobody collected are dropped after this many seconds
+JOB_TTL = 3600
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when cancellation was requested."""
+
+
+@dataclass
+class Job:
+    id: str
+    label: str
+    owner: Optional[str]
+    status: str = PENDING
+    progress: float = 0.0
+    message: str = ""
+    result: Any = None
+    error: str = ""
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+
+
+class JobContext:
+    """Handle passed to job functions for progress reporting and cancellation checks."""
+
+    def __init__(self, job: Job):
+        self._job = job
+
+    @property
+    def cancelled(self) -> bool:
+        return self._job.cancel_event.is_set()
+
+    def check(self):
+        if self.cancelled:
+            raise JobCancelled()
+
+    def progress(self, fraction: float, message: str = ""):
+        self.check()
+        self._job.progress = max(0.0, min(1.0, fraction))
+        if message:
+            self._job.message = message
+
+
+class JobManager:
+    """Process-wide job registry; jobs outlive the Streamlit rerun that submitted them."""
+
+    def __init__(self, max_workers: int = MAX_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agent-job")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable[..., Any], *args, label: str = "", owner: Optional[str] = None, **kwargs) -> str:
+        """Queue fn(ctx, *args, **kwargs) and return its job id."""
+        job = Job(id=uuid.uuid4().hex, label=label, owner=owner)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        # Run in a copy of the caller's context so an active trace follows the job
+        self._executor.submit(contextvars.copy_context().run, self._run, job, fn, args, kwargs)
+        return job.id
+
+    def _run(self, job: Job, fn, args, kwargs):
+        if job.cancel_event.is_set():
+            self._finish(job, CANCELLED)
+            return
+        job.status = RUNNING
+        try:
+            with tracing.span("job", label=job.label):
+                job.result = fn(JobContext(job), *args, **kwargs)
+            job.progress = 1.0
+            self._finish(job, CANCELLED if job.cancel_event.is_set() else DONE)
+        except JobCancelled:
+            self._finish(job, CANCELLED)
+        except Exception as e:
+            print(f"[JobError] {job.label}: {e!r}")
+            job.error = str(e)
+            self._finish(job, FAILED)
+
+    def _finish(self, job: Job, status: str):
+        job.finished_at = time.time()
+        job.status = status
+
+    def _prune(self):
+        cutoff = time.time() - JOB_TTL
+        for job_id in [j.id for j in self._jobs.values() if j.finished_at and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None or job.status in FINISHED:
+            return False
+        job.cancel_event.set()
+        return True
+
+    def result(self, job_id: str) -> Any:
+        job = self._jobs.get(job_id)
+        return job.result if job and job.status == DONE else None
+
+    def forget(self, job_id: str):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def jobs_for(self, owner: Optional[str]) -> List[Job]:
+        return sorted((j for j in self._jobs.values() if j.owner == owner), key=lambda j: j.created_at)
+
+
+_manager: Optional[JobManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_manager() -> JobManager:
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = JobManager()
+    return _manager
+
+
+def submit(fn: Callable[..., Any], *args, label: str = "", owner: Optional[str] = None, **kwargs) -> str:
+    return get_manager().submit(fn, *args, label=label, owner=owner, **kwargs)
+
+
+# Streamlit helpers
+
+def collect(pending: Dict[str, str], results: Dict[str, Any]) -> bool:
+    """
+    Move finished jobs from `pending` (key -> job id) into `results` (key -> result).
+    Returns True if anything finished.
+    """
+    manager = get_manager()
+    changed = False
+    for key, job_id in list(pending.items()):
+        job = manager.get(job_id)
+        if job is None:
+            del pending[key]
+            changed = True
+        elif job.status in FINISHED:
+            if job.status == DONE:
+                results[key] = job.result
+            elif job.status == FAILED:
+                st.error(f"{job.label} failed: {job.error}")
+            del pending[key]
+            manager.forget(job_id)
+            changed = True
+    return changed
+
+
+@st.fragment(run_every=1.0)
+def _job_panel(pending: Dict[str, str], results: Dict[str, Any]):
+    manager = get_manager()
+    if collect(pending, results):
+        st.rerun()
+    for key, job_id in list(pending.items()):
+        job = manager.get(job_id)
+        if job is None:
+            continue
+        cols = st.columns([5, 1])
+        with cols[0]:
+            text = f"{job.label} — {job.message or job.status}"
+            st.progress(job.progress, text=text)
+        with cols[1]:
+            if st.button("Cancel", key=f"cancel_{job_id}"):
+                manager.cancel(job_id)
+
+
+def show_jobs(pending: Dict[str, str], results: Dict[str, Any]):
+    """Render a self-refreshing progress panel for pending jobs, then collect their results."""
+    collect(pending, results)
+    if pending:
+        _job_panel(pending, results)
@@ -0,0 +1,161 @@
+# utils/json_salvage.py
+from typing import Any, Set, Tuple
+
+ESCAPES = {'"': '"', "'": "'", "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+LITERALS = {"true": True, "false": False, "null": None, "True": True, "False": False, "None": None}
+
+
+class _Parser:
+    """
+    Recursive-descent JSON parser that never raises: on truncation or a malformed
+    character it stops there and hands back everything parsed so far.
+    Every parse method returns (value, complete).
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.pos = 0
+        self.end = len(text)
+        self.incomplete: Set[str] = set()  # top-level keys whose value was cut off
+
+    def stop(self):
+        # Treat anything from here on as missing
+        self.end = self.pos
+
+    def at_end(self) -> bool:
+        self.skip_ws()
+        return self.pos >= self.end
+
+    def skip_ws(self):
+        while self.pos < self.end and self.text[self.pos] in " \t\r\n":
+            self.pos += 1
+
+    def value(self, depth: int) -> Tuple[Any, bool]:
+        if self.at_end():
+            return None, False
+        ch = self.text[self.pos]
+        if ch == "{":
+            return self.obj(depth)
+        if ch == "[":
+            return self.arr(depth)
+        if ch in "\"'":
+            return self.string()
+        if ch in "-0123456789":
+            return self.number()
+        return self.literal()
+
+    def obj(self, depth: int) -> Tuple[dict, bool]:
+        self.pos += 1
+        out: dict = {}
+        while not self.at_end():
+            ch = self.text[self.pos]
+            if ch == "}":
+                self.pos += 1
+                return out, True
+            if ch == ",":  # also forgives trailing and doubled commas
+                self.pos += 1
+                continue
+            if ch not in "\"'":
+                self.stop()
+                break
+            key, ok = self.string()
+            if not ok or self.at_end() or self.text[self.pos] != ":":
+                self.stop()
+                break
+            self.pos += 1
+            val, ok = self.value(depth + 1)
+            if val is not None or ok:
+                out[key] = val
+            if not ok:
+                if depth == 0:
+                    self.incomplete.add(key)
+                break
+        return out, False
+
+    def arr(self, depth: int) -> Tuple[list, bool]:
+        self.pos += 1
+        out: list = []
+        while not self.at_end():
+            ch = self.text[self.pos]
+            if ch == "]":
+                self.pos += 1
+                return out, True
+            if ch == ",":
+                self.pos += 1
+                continue
+            val, ok = self.value(depth + 1)
+            if ok:  # a cut-off element is dropped, the rest of the list is kept
+                out.append(val)
+            else:
+                break
+        return out, False
+
+    def string(self) -> Tuple[str, bool]:
+        quote = self.text[self.pos]
+        self.pos += 1
+        chars = []
+        while self.pos < self.end:
+            ch = self.text[self.pos]
+            if ch == quote:
+                self.pos += 1
+                return "".join(chars), True
+            if ch == "\\":
+                if self.pos + 1 >= self.end:
+                    break
+                esc = self.text[self.pos + 1]
+                if esc == "u":
+                    digits = self.text[self.pos + 2:self.pos + 6]
+                    if len(digits) < 4 or self.pos + 6 > self.end:
+                        break
+                    try:
+                        chars.append(chr(int(digits, 16)))
+                    except ValueError:
+                        self.stop()
+                        break
+                    self.pos += 6
+                    continue
+                chars.append(ESCAPES.get(esc, esc))
+                self.pos += 2
+                continue
+            chars.append(ch)
+            self.pos += 1
+        self.pos = self.end
+        return "".join(chars), False
+
+    def number(self) -> Tuple[Any, bool]:
+        start = self.pos
+        while self.pos < self.end and self.text[self.pos] in "+-0123456789.eE":
+            self.pos += 1
+        raw = self.text[start:self.pos]
+        if self.pos >= self.end:  # "8" may have been the start of "85"
+            return None, False
+        try:
+            return (float(raw) if any(c in raw for c in ".eE") else int(raw)), True
+        except ValueError:
+            self.pos = start
+            self.stop()
+            return None, False
+
+    def literal(self) -> Tuple[Any, bool]:
+        for word, val in LITERALS.items():
+            if self.text.startswith(word, self.pos) and self.pos + len(word) <= self.end:
+                self.pos += len(word)
+                return val, True
+        self.stop()
+        return None, False
+
+
+def salvage_json(text: str) -> Tuple[dict, Set[str]]:
+    """
+    Recover what can be recovered from a truncated or slightly malformed JSON object
+    (code fences, leading prose, trailing commas, single quotes, Python literals).
+    Returns (data, incomplete) where incomplete holds the top-level keys whose values
+    were cut off and so should not be trusted.
+    """
+    start = text.find("{")
+    if start < 0:
+        return {}, set()
+    parser = _Parser(text)
+    parser.pos = start
+    data, _ = parser.obj(0)
+    return data, parser.incomplete
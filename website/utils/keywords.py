@@ -0,0 +1,155 @@
+# utils/keywords.py
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+COMMON_WORDS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resources", "common_en.txt")
+# Weight of a common word inside a phrase; every other word counts 1
+COMMON_WEIGHT = 0.5
+MAX_PHRASE_TOKENS = 4
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from further had has
+have having he her here hers herself him himself his how i if in into is it its itself just me more
+most my myself no nor not now of off on once only or other our ours ourselves out over own same she
+should so some such than that the their theirs them themselves then there these they this those
+through to too under until up very was we were what when where which while who whom why will with
+would you your yours yourself yourselves mr mrs ms dr st
+monday tuesday wednesday thursday friday saturday sunday
+january february march april may june july august september october november december
+""".split())
+
+TOKEN_RE = re.compile(r"[A-Za-z][A-Za-z0-9]*(?:['’\-][A-Za-z0-9]+)*")
+POSSESSIVE_RE = re.compile(r"['’]s$")
+SENTENCE_END_RE = re.compile(r"[.!?]+[\"'”’)]*\s+|\n{2,}")
+
+
+@lru_cache(maxsize=1)
+def load_common_words() -> frozenset:
+    """Load the short list of common English words shipped with the app."""
+    words = set()
+    try:
+        with open(COMMON_WORDS_PATH, encoding="utf-8") as f:
+            for line in f:
+                if line.strip() and not line.startswith("#"):
+                    words.add(line.strip())
+    except OSError as e:
+        print(f"[Keywords] Common word list unavailable: {e!r}")
+    return frozenset(words)
+
+
+def weight(word: str) -> float:
+    return COMMON_WEIGHT if word.lower() in load_common_words() else 1.0
+
+
+def tokenize(text: str) -> List[Tuple[str, int, bool]]:
+    """Split text into (token, offset, sentence_initial) triples."""
+    sentence_starts = {0}
+    for m in SENTENCE_END_RE.finditer(text):
+        sentence_starts.add(m.end())
+    tokens = []
+    next_start = 0
+    starts = sorted(sentence_starts)
+    for m in TOKEN_RE.finditer(text):
+        # A token is sentence-initial if no token came between it and the last sentence boundary
+        initial = False
+        while next_start < len(starts) and starts[next_start] <= m.start():
+            initial = True
+            next_start += 1
+        tokens.append((POSSESSIVE_RE.sub("", m.group()), m.start(), initial))
+    return tokens
+
+
+def _is_entity_token(token: str, lowercase_seen: set) -> bool:
+    """Capitalized, non-stopword token that is not just a capitalized common word."""
+    lower = token.lower()
+    if lower in STOPWORDS or len(token) < 2:
+        return False
+    if token.isupper():
+        return True  # acronyms: IPL, NASA
+    return token[0].isupper() and lower not in lowercase_seen
+
+
+def candidate_phrases(text: str) -> List[Tuple[str, int]]:
+    """Return (phrase, offset) for every run of named-entity-like tokens."""
+    tokens = tokenize(text)
+    lowercase_seen = {t for t, _, _ in tokens if t.islower()}
+    # Words that are capitalized mid-sentence somewhere are names, not sentence-initial filler
+    confirmed = {t.lower() for t, _, initial in tokens if not initial and t[0].isupper()}
+    phrases = []
+    run: List[Tuple[str, int, bool]] = []
+    last_end = -1
+
+    def flush():
+        if not run:
+            return
+        token, offset, initial = run[0]
+        # An unconfirmed sentence-initial word on its own is usually just a capitalized word
+        if not (len(run) == 1 and initial and token.lower() not in confirmed and not token.isupper()):
+            phrases.append((" ".join(t for t, _, _ in run), offset))
+        run.clear()
+
+    for token, offset, initial in tokens:
+        adjacent = run and text[last_end:offset].strip() == ""
+        if _is_entity_token(token, lowercase_seen):
+            if not adjacent or len(run) >= MAX_PHRASE_TOKENS:
+                flush()
+            run.append((token, offset, initial))
+        else:
+            flush()
+        last_end = offset + len(token)
+    flush()
+    return phrases
+
+
+def rank_keyphrases(text: str, top_k: int = 5) -> List[str]:
+    """
+    Rank keyphrases deterministically by frequency x length (common words count less),
+    with ties broken by first position then alphabetically. Entity-like phrases come
+    first; frequent lowercase content words fill any remaining slots.
+    """
+    stats: Dict[str, List] = {}  # key -> [surface, count, first_offset]
+    for phrase, offset in candidate_phrases(text):
+        key = phrase.lower()
+        if key in stats:
+            stats[key][1] += 1
+        else:
+            stats[key] = [phrase, 1, offset]
+
+    def score(key: str, count: int) -> float:
+        return count * sum(weight(w) for w in key.split())
+
+    ranked = sorted(stats.items(), key=lambda kv: (-score(kv[0], kv[1][1]), kv[1][2], kv[0]))
+    selected: List[str] = []
+    for key, (surface, _, _) in ranked:
+        # Skip phrases already covered by a longer selected phrase
+        if any(f" {key} " in f" {s.lower()} " for s in selected):
+            continue
+        selected.append(surface)
+        if len(selected) == top_k:
+            return selected
+
+    # Fallback: frequent lowercase content words
+    words: Dict[str, List] = {}
+    for token, offset, _ in tokenize(text):
+        lower = token.lower()
+        if lower in STOPWORDS or len(lower) < 3 or lower in stats:
+            continue
+        if lower in words:
+            words[lower][0] += 1
+        else:
+            words[lower] = [1, offset]
+    for word, _ in sorted(words.items(), key=lambda kv: (-kv[1][0] * weight(kv[0]), kv[1][1], kv[0])):
+        if len(selected) == top_k:
+            break
+        if not any(word in s.lower().split() for s in selected):
+            selected.append(word)
+    return selected
+
+
+@lru_cache(maxsize=256)
+def extract_query_terms(text: str, top_k: int = 5) -> str:
+    """Stable search query for a piece of text."""
+    return " ".join(rank_keyphrases(text, top_k))
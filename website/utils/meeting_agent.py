@@ -1,36 +1,116 @@
 # utils/meeting_agent.py
+import time
 import streamlit as st
-from .schemas import MeetingProposal
+from datetime import date, datetime, timedelta
+from datetime import time as dtime
+from pathlib import Path
+from typing import Dict, List, Tuple
+from .schemas import MeetingAgenda, MeetingProposal
 from .ollama_handler import structured_ollama_call
+from . import storage, scheduler, tracing, ui
 
 def show_ui():
     st.header("Meeting Scheduler 🗓️")
-    
+
     attendees = st.text_input("Attendees (comma separated)")
     duration = st.slider("Duration (minutes)", 15, 120, 30)
     purpose = st.text_area("Meeting Purpose")
-    timezone = st.selectbox("Timezone", ["UTC", "IST", "PST", "CET"])
-    
+    timezone = st.selectbox("Timezone", list(scheduler.TIMEZONES.keys()))
+
+    with st.expander("📅 Availability", expanded=True):
+        st.caption("Upload one .ics calendar per attendee (named after the attendee), "
+                   "or a CSV with `attendee,start,end[,timezone]` busy times.")
+        calendars = st.file_uploader("Calendars", type=["ics", "csv"], accept_multiple_files=True)
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            start_day = st.date_input("Search from", date.today() + timedelta(days=1))
+            days = st.number_input("Days to search", 1, 60, 7)
+        with col2:
+            day_start = st.time_input("Working hours start", dtime(9, 0))
+            day_end = st.time_input("Working hours end", dtime(17, 0))
+        with col3:
+            weekdays_only = st.checkbox("Weekdays only", True)
+
     if st.button("Generate Proposal"):
-        result = schedule_meeting(attendees, duration, purpose, timezone)
-        
+        tz = scheduler.get_zone(timezone)
+        started = time.perf_counter()
+        windows = scheduler.working_windows(start_day, int(days), tz, day_start, day_end, weekdays_only)
+        range_end = datetime.combine(start_day + timedelta(days=int(days)), dtime(0, 0), tzinfo=tz)
+        with tracing.span("parse"):
+            busy, warnings = load_busy_times(calendars or [], tz, range_end)
+        with tracing.span("solve"):
+            slots = scheduler.find_slots(busy, windows, timedelta(minutes=duration))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        st.subheader("Available Times")
+        st.caption(f"Computed from {sum(len(v) for v in busy.values())} busy intervals "
+                   f"for {len(busy)} attendee(s) in {elapsed_ms:.1f} ms")
+        if not busy:
+            st.info("No calendars uploaded, so every slot inside working hours is shown as free.")
+        else:
+            names = [a.strip() for a in attendees.split(",") if a.strip()]
+            known = {a.lower() for a in busy}
+            missing = [a for a in names if a.lower() not in known]
+            if missing:
+                st.info(f"No calendar for {', '.join(missing)}; they are assumed free.")
+        for warning in warnings:
+            st.warning(warning)
+        if not slots:
+            st.warning("No slot fits inside the working hours of the search range.")
+        for slot in slots:
+            conflicts = f" — conflicts: {', '.join(slot.busy)}" if slot.busy else ""
+            st.write(f"- {format_slot(slot, tz)}{conflicts}")
+
+        suggested = format_slot(slots[0], tz) if slots else "No common availability found"
+        agenda, _ = storage.reuse_or_run(
+            st.session_state.auth['user'], "meeting", storage.hash_input(attendees, duration, purpose, timezone),
+            MeetingAgenda, lambda: plan_agenda(attendees, duration, purpose), title=purpose
+        )
+        result = MeetingProposal(suggested_time=suggested, **agenda.model_dump())
+
         st.subheader("Meeting Proposal")
+        ui.repair_notice(agenda)
         st.markdown(f"**Best Time:** {result.suggested_time}")
         st.markdown("**Agenda:**")
         for item in result.agenda_items:
             st.write(f"- {item}")
         st.markdown(f"**Follow-up Actions:** {result.follow_up_actions}")
 
-def schedule_meeting(attendees: str, duration: int, purpose: str, tz: str) -> MeetingProposal:
-    prompt = f"""
-    Create meeting proposal with:
+def load_busy_times(files, tz, range_end: datetime) -> Tuple[Dict[str, List[scheduler.Interval]], List[str]]:
+    """Busy intervals per attendee from uploaded ICS/CSV files, plus warnings about what was approximated."""
+    busy: Dict[str, List[scheduler.Interval]] = {}
+    warnings: List[str] = []
+    for file in files:
+        text = file.getvalue().decode("utf-8", "replace")
+        try:
+            if file.name.lower().endswith(".ics"):
+                intervals, notes = scheduler.parse_ics(text, tz, range_end)
+                busy.setdefault(Path(file.name).stem, []).extend(intervals)
+            else:
+                table, notes = scheduler.parse_table(text, tz)
+                for attendee, intervals in table.items():
+                    busy.setdefault(attendee, []).extend(intervals)
+        except (ValueError, OverflowError) as e:
+            st.error(f"Could not read {file.name}: {e}")
+            continue
+        warnings.extend(f"{file.name}: {note}" for note in notes)
+    return busy, warnings
+
+def format_slot(slot: scheduler.Slot, tz) -> str:
+    start, end = slot.start.astimezone(tz), slot.end.astimezone(tz)
+    return f"{start:%a %d %b %Y, %H:%M}–{end:%H:%M} {start.tzname()}"
+
+def plan_agenda(attendees: str, duration: int, purpose: str) -> MeetingAgenda:
+    """The LLM only writes the agenda and follow-ups; the time comes from the solver."""
+    with tracing.span("prompt"):
+        prompt = f"""
+    Create a meeting agenda with:
     - Attendees: {attendees}
     - Duration: {duration} minutes
     - Purpose: {purpose}
-    - Timezone: {tz}
     """
     return structured_ollama_call(
         prompt=prompt,
-        response_model=MeetingProposal,
+        response_model=MeetingAgenda,
         model="gemma3"
-    )
\ No newline at end of file
+    )
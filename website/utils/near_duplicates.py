@@ -0,0 +1,127 @@
+# utils/near_duplicates.py
+import os
+import re
+import struct
+import hashlib
+from typing import List, Optional, Set, Tuple, Type
+from pydantic import BaseModel, ValidationError
+from . import storage
+
+# MinHash LSH over word shingles: 32 bands x 4 rows = 128 hash functions
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+# Minimum estimated Jaccard similarity to reuse a verdict (override with NEAR_DUPLICATE_THRESHOLD)
+THRESHOLD = float(os.environ.get("NEAR_DUPLICATE_THRESHOLD", "0.8"))
+# Oldest signatures are evicted beyond this many entries
+MAX_ENTRIES = int(os.environ.get("NEAR_DUPLICATE_MAX_ENTRIES", "100000"))
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_SIG_FORMAT = f"<{NUM_PERM}I"
+
+
+def _seeded_params() -> List[Tuple[int, int]]:
+    """Fixed (a, b) pairs so signatures stay comparable across restarts."""
+    params = []
+    for i in range(NUM_PERM):
+        digest = hashlib.blake2b(f"minhash-{i}".encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], "little") % (_PRIME - 1) + 1
+        b = int.from_bytes(digest[8:], "little") % _PRIME
+        params.append((a, b))
+    return params
+
+
+_PARAMS = _seeded_params()
+
+
+def normalize(text: str) -> List[str]:
+    """Lowercase word tokens, ignoring punctuation and whitespace differences."""
+    return re.findall(r"\w+", text.lower())
+
+
+def shingles(text: str) -> Set[int]:
+    words = normalize(text)
+    if len(words) < SHINGLE_SIZE:
+        words = words + [""] * (SHINGLE_SIZE - len(words))
+    return {
+        int.from_bytes(hashlib.blake2b(" ".join(words[i:i + SHINGLE_SIZE]).encode(), digest_size=8).digest(), "little")
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+def minhash(text: str) -> Tuple[int, ...]:
+    """MinHash signature of the text's word shingles."""
+    values = shingles(text)
+    return tuple(
+        min(((a * v + b) % _PRIME) & _MAX_HASH for v in values)
+        for a, b in _PARAMS
+    )
+
+
+def similarity(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / NUM_PERM
+
+
+def _buckets(signature: Tuple[int, ...]) -> List[Tuple[int, int]]:
+    buckets = []
+    for band in range(BANDS):
+        chunk = struct.pack(f"<{ROWS}I", *signature[band * ROWS:(band + 1) * ROWS])
+        # Signed 63-bit so it fits SQLite INTEGER
+        bucket = int.from_bytes(hashlib.blake2b(chunk, digest_size=8).digest(), "little") >> 1
+        buckets.append((band, bucket))
+    return buckets
+
+
+def find_similar(text: str, response_model: Type[BaseModel],
+                 threshold: float = THRESHOLD) -> Optional[Tuple[BaseModel, float]]:
+    """Return (previous result, similarity) for the closest archived near-duplicate, if any."""
+    signature = minhash(text)
+    buckets = _buckets(signature)
+    placeholders = ",".join("(?, ?)" for _ in buckets)
+    params = [x for pair in buckets for x in pair]
+    with storage.get_pool().connection() as conn:
+        rows = conn.execute(
+            "SELECT id, signature, result_json FROM news_signatures WHERE id IN ("
+            f"SELECT DISTINCT doc_id FROM news_lsh WHERE (band, bucket) IN (VALUES {placeholders}))",
+            params,
+        ).fetchall()
+    best = None
+    for row in rows:
+        score = similarity(signature, struct.unpack(_SIG_FORMAT, row["signature"]))
+        if score >= threshold and (best is None or score > best[1]):
+            best = (row, score)
+    if best is None:
+        return None
+    try:
+        return response_model.model_validate_json(best[0]["result_json"]), best[1]
+    except ValidationError:
+        return None
+
+
+def add(text: str, content_hash: str, result: BaseModel):
+    """Archive a validated article's signature and verdict, evicting the oldest entries."""
+    signature = minhash(text)
+    with storage.get_pool().connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cur = conn.execute(
+                "INSERT INTO news_signatures (content_hash, signature, result_json, created_at) "
+                "VALUES (?, ?, ?, datetime('now'))",
+                (content_hash, struct.pack(_SIG_FORMAT, *signature), result.model_dump_json()),
+            )
+            doc_id = cur.lastrowid
+            conn.executemany(
+                "INSERT OR IGNORE INTO news_lsh (band, bucket, doc_id) VALUES (?, ?, ?)",
+                [(band, bucket, doc_id) for band, bucket in _buckets(signature)],
+            )
+            cutoff = doc_id - MAX_ENTRIES
+            if cutoff > 0:
+                conn.execute("DELETE FROM news_lsh WHERE doc_id <= ?", (cutoff,))
+                conn.execute("DELETE FROM news_signatures WHERE id <= ?", (cutoff,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
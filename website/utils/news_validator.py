@@ -2,11 +2,13 @@ import streamlit as st
 from googlesearch import search
 from .schemas import NewsAnalysis
 from .ollama_handler import structured_ollama_call
+from . import storage, jobs, near_duplicates, tracing, ui
+from .keywords import extract_query_terms
 import PyPDF2
 import hashlib
 from datetime import datetime
+from typing import Callable, Optional, Tuple
 import time
-import re
 
 # Enhanced prompt template
 PROMPT_TEMPLATE = """
@@ -37,6 +39,7 @@ PROMPT_TEMPLATE = """
 - is_fake = False → News is authentic/accurate
 """
 
+@tracing.traced("search")
 def safe_google_search(query, num_results=3):
     """Wrapper for googlesearch with error handling"""
     try:
@@ -56,19 +59,21 @@ def safe_google_search(query, num_results=3):
         st.error(f"Search encountered an issue: {str(e)}")
         return []
 
+@tracing.traced("keywords")
 def extract_keywords(content):
-    """Extract important keywords for better search"""
-    words = re.findall(r'\b[A-Z][a-z]+\b', content)
-    unique_words = list(set(words))
-    return " ".join(unique_words[:5])  # Return top 5 unique capitalized words
+    """Extract important keywords for better search (deterministic, top 5 keyphrases)"""
+    return extract_query_terms(content, 5)
 
-def validate_news(content: str) -> NewsAnalysis:
+def validate_news(content: str, progress: Optional[Callable[[float, str], None]] = None) -> NewsAnalysis:
+    if progress is None:
+        progress = lambda fraction, message: None
     try:
         # Get current date context
         current_date = datetime.now().strftime("%B %d, %Y")
         current_year = datetime.now().year
         
         # Extract keywords for better search
+        progress(0.1, "Extracting keywords…")
         keywords = extract_keywords(content)
         if not keywords:
             keywords = content[:50]  # Fallback to first 50 characters
@@ -80,6 +85,7 @@ def validate_news(content: str) -> NewsAnalysis:
         if "cricket" in content.lower() or "ipl" in content.lower():
             query += " site:espncricinfo.com OR site:cricbuzz.com"
         
+        progress(0.2, "Searching sources…")
         sources = safe_google_search(query, 5)
         
         # Format sources with metadata
@@ -92,26 +98,84 @@ def validate_news(content: str) -> NewsAnalysis:
         formatted_sources = "No sources available"
 
     # Build detailed prompt with special instructions
-    prompt = PROMPT_TEMPLATE.format(
-        content=content,
-        formatted_sources=formatted_sources,
-        current_date=current_date
-    )
+    with tracing.span("prompt"):
+        prompt = PROMPT_TEMPLATE.format(
+            content=content,
+            formatted_sources=formatted_sources,
+            current_date=current_date
+        )
     
-    # Add special handling for sports/news
-    if "cricket" in content.lower() or "ipl" in content.lower():
-        prompt += "\n\n**Sports News Context:**\n" \
-                  "Verify using sports-specific domains. Recent matches might have limited coverage. " \
-                  "Focus on official team/league sites when available."
+        # Add special handling for sports/news
+        if "cricket" in content.lower() or "ipl" in content.lower():
+            prompt += "\n\n**Sports News Context:**\n" \
+                      "Verify using sports-specific domains. Recent matches might have limited coverage. " \
+                      "Focus on official team/league sites when available."
 
+    progress(0.6, "Running analysis…")
     return structured_ollama_call(
         prompt=prompt,
         response_model=NewsAnalysis,
         model="gemma3"
     )
 
+def _validate_job(ctx, user, content: str) -> Tuple[NewsAnalysis, str]:
+    """
+    Background job: validate news, reusing an identical or near-duplicate earlier
+    analysis when possible. Returns (result, note).
+    """
+    input_hash = storage.hash_input(content)
+    note = ""
+
+    def compute() -> NewsAnalysis:
+        nonlocal note
+        ctx.progress(0.05, "Checking previous analyses…")
+        match = near_duplicates.find_similar(content, NewsAnalysis)
+        if match:
+            result, score = match
+            note = f"Matched previous analysis ({score:.0%} similar)"
+            return result
+        result = validate_news(content, ctx.progress)
+        if not result.has_placeholders:
+            near_duplicates.add(content, input_hash, result)
+        return result
+
+    try:
+        result, reused = storage.reuse_or_run(
+            user, "news", input_hash, NewsAnalysis, compute, title=content[:80]
+        )
+        if reused:
+            note = "Matched previous analysis (identical content)"
+        return result, note
+    except jobs.JobCancelled:
+        raise
+    except Exception as e:
+        print(f"[NewsValidator] Validation failed: {e!r}")
+        return NewsAnalysis(
+            is_fake=False,
+            confidence=0,
+            reasons=["Validation process encountered an error"],
+            related_entities=[],
+            source_credibility=0,
+            supporting_evidence=[]
+        ), ""
+
 def show_ui():
     st.header("📰 News Validator")
+
+    # Use hash for consistent caching
+    if "news_results" not in st.session_state:
+        st.session_state.news_results = {}
+    if "news_jobs" not in st.session_state:
+        st.session_state.news_jobs = {}  # content hash -> job id
+
+    input_panel()
+    jobs.show_jobs(st.session_state.news_jobs, st.session_state.news_results)
+    results_panel()
+
+@st.fragment
+@ui.traced_fragment("News input")
+def input_panel():
+    """Typing or switching input type reruns only this panel, not the report list."""
     input_type = st.radio("Input Type", ["Text", "URL", "File"], horizontal=True)
     content = ""
 
@@ -138,88 +202,85 @@ def show_ui():
                     st.error(f"File error: {e}")
                     content = ""
 
-    # Use hash for consistent caching
-    if "news_results" not in st.session_state:
-        st.session_state.news_results = {}
-
     if st.button("🔍 Validate News", type="primary") and content:
         content_hash = hashlib.md5(content.encode()).hexdigest()
         
-        if content_hash not in st.session_state.news_results:
-            with st.spinner("Analyzing news content..."):
-                try:
-                    result = validate_news(content)
-                    st.session_state.news_results[content_hash] = result
-                except Exception as e:
-                    st.error(f"Validation failed: {e}")
-                    # Create default response
-                    st.session_state.news_results[content_hash] = NewsAnalysis(
-                        is_fake=False,
-                        confidence=0,
-                        reasons=["Validation process encountered an error"],
-                        related_entities=[],
-                        source_credibility=0,
-                        supporting_evidence=[]
-                    )
-
-    # Display results
-    for key, result in st.session_state.news_results.items():
-        with st.expander("📝 News Analysis Report", expanded=True):
-            # Status indicator with confidence
-            if result.is_fake:
-                status = "❌ Fake News"
-                color = "red"
-                icon = "⚠️"
-            else:
-                status = "✅ Authentic News"
-                color = "green"
-                icon = "✔️"
-                
-            st.subheader(f"{icon} :{color}[{status}] ({result.confidence}% confidence)")
-            
-            # Confidence meter with color coding
-            confidence_color = "red" if result.confidence < 40 else "orange" if result.confidence < 70 else "green"
-            st.progress(result.confidence / 100, text=f"Confidence Level: {result.confidence}%")
-            
-            # Two-column layout
-            col1, col2 = st.columns([1, 1])
-            
-            with col1:
-                st.subheader("🔍 Analysis Details")
-                with st.container(border=True):
-                    st.markdown("**📋 Reasons**")
-                    if result.reasons:
-                        for reason in result.reasons:
-                            st.info(f"- {reason}")
-                    else:
-                        st.warning("No analysis reasons provided")
-                
-                with st.container(border=True):
-                    st.markdown("**🏷️ Related Entities**")
-                    if result.related_entities:
-                        for ent in result.related_entities:
-                            st.write(f"- {ent}")
-                    else:
-                        st.info("No entities identified")
-
-            with col2:
-                st.subheader("📚 Source Evaluation")
-                with st.container(border=True):
-                    st.markdown("**⭐ Source Credibility**")
-                    # Visual credibility indicator
-                    credibility_color = "red" if result.source_credibility < 40 else "orange" if result.source_credibility < 70 else "green"
-                    st.markdown(f"<div style='color:{credibility_color}; font-size: 24px;'>{result.source_credibility}/100</div>", 
-                                unsafe_allow_html=True)
-                    st.caption("Higher is better (based on domain authority and consistency)")
-                
-                with st.container(border=True):
-                    st.markdown("**🔗 Supporting Evidence**")
-                    if result.supporting_evidence:
-                        for ev in result.supporting_evidence:
-                            st.success(f"- {ev}")
-                    else:
-                        st.warning("No supporting evidence found")
-
-            # Add disclaimer
-            st.caption("ℹ️ Note: Analysis is based on available web sources. Confidence scores reflect consistency across sources. "
-                       "Recent events might have limited coverage.")
\ No newline at end of file
+        if content_hash not in st.session_state.news_results and content_hash not in st.session_state.news_jobs:
+            user = st.session_state.auth['user']
+            st.session_state.news_jobs[content_hash] = jobs.submit(
+                _validate_job, user, content, label="News validation", owner=user
+            )
+            st.rerun()
+
+@st.fragment
+@ui.traced_fragment("News reports")
+def results_panel():
+    results = st.session_state.news_results
+    with tracing.span("render", items=len(results)), ui.render_timer("News reports"):
+        # Newest first; only the current page is rendered
+        for key, (result, note) in ui.paginate(list(results.items())[::-1], "news_results"):
+            render_report(result, note)
+
+def render_report(result: NewsAnalysis, note: str):
+    with st.expander("📝 News Analysis Report", expanded=True):
+        if note:
+            st.info(f"♻️ {note}")
+        ui.repair_notice(result)
+        # Status indicator with confidence
+        if result.is_fake:
+            status = "❌ Fake News"
+            color = "red"
+            icon = "⚠️"
+        else:
+            status = "✅ Authentic News"
+            color = "green"
+            icon = "✔️"
+        
+        st.subheader(f"{icon} :{color}[{status}] ({result.confidence}% confidence)")
+    
+        # Confidence meter with color coding
+        confidence_color = "red" if result.confidence < 40 else "orange" if result.confidence < 70 else "green"
+        st.progress(result.confidence / 100, text=f"Confidence Level: {result.confidence}%")
+    
+        # Two-column layout
+        col1, col2 = st.columns([1, 1])
+    
+        with col1:
+            st.subheader("🔍 Analysis Details")
+            with st.container(border=True):
+                st.markdown("**📋 Reasons**")
+                if result.reasons:
+                    for reason in result.reasons:
+                        st.info(f"- {reason}")
+                else:
+                    st.warning("No analysis reasons provided")
+        
+            with st.container(border=True):
+                st.markdown("**🏷️ Related Entities**")
+                if result.related_entities:
+                    for ent in result.related_entities:
+                        st.write(f"- {ent}")
+                else:
+                    st.info("No entities identified")
+
+        with col2:
+            st.subheader("📚 Source Evaluation")
+            with st.container(border=True):
+                st.markdown("**⭐ Source Credibility**")
+                # Visual credibility indicator
+                credibility_color = "red" if result.source_credibility < 40 else "orange" if result.source_credibility < 70 else "green"
+                st.markdown(f"<div style='color:{credibility_color}; font-size: 24px;'>{result.source_credibility}/100</div>", 
+                            unsafe_allow_html=True)
+                st.caption("Higher is better (based on domain authority and consistency)")
+        
+            with st.container(border=True):
+                st.markdown("**🔗 Supporting Evidence**")
+                if result.supporting_evidence:
+                    for ev in result.supporting_evidence:
+                        st.success(f"- {ev}")
+                else:
+                    st.warning("No supporting evidence found")
+
+        # Add disclaimer
+        st.caption("ℹ️ Note: Analysis is based on available web sources. Confidence scores reflect consistency across sources. "
+                   "Recent events might have limited coverage.")
@@ -1,7 +1,27 @@
+import os
+import json
+import threading
+from functools import lru_cache
 from ollama import chat
-from pydantic import BaseModel, ValidationError
-from typing import Type
-from .schemas import EmailContent, MeetingProposal, QAResponse, ResumeAnalysis, NewsAnalysis, CodeAnalysis
+from pydantic import BaseModel, ValidationError, create_model
+from typing import Dict, List, Set, Tuple, Type
+from . import jobs, tracing
+from .json_salvage import salvage_json
+from .schemas import AgentResult, EmailContent, MeetingAgenda, MeetingProposal, QAResponse, RepairNote, ResumeAnalysis, NewsAnalysis, CodeAnalysis, FileAnalysis, RepoSummary
+
+REASK_TEMPLATE = """
+Your previous answer was cut off or invalid. The fields shown above are fine and must not be repeated.
+Return JSON with ONLY these fields: {fields}
+"""
+
+# One limit for every Ollama request in the process, however many jobs and per-item
+# pools are running; match the server's OLLAMA_NUM_PARALLEL
+MAX_PARALLEL = int(os.environ.get("OLLAMA_NUM_PARALLEL", jobs.MAX_WORKERS))
+_slots = threading.BoundedSemaphore(MAX_PARALLEL)
+
+def _chat(**kwargs):
+    with _slots:
+        return chat(**kwargs)
 
 def structured_ollama_call(
     prompt: str,
@@ -10,67 +30,171 @@ def structured_ollama_call(
 ) -> BaseModel:
     """
     Makes structured call to Ollama with Pydantic validation.
-    On any error, returns a response_model instance with safe defaults.
+    Output that fails validation is repaired: valid fields are salvaged and only the
+    missing or invalid ones are asked for again. On any other error, returns a
+    response_model instance with safe defaults.
     """
     try:
-        response = chat(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-            format=response_model.model_json_schema(),
-        )
-        return response_model.model_validate_json(response['message']['content'])
-    except (ValidationError, Exception) as e:
+        with tracing.span("llm", model=model, schema=response_model.__name__, prompt_chars=len(prompt)):
+            response = _chat(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                format=response_model.model_json_schema(),
+            )
+        content = response['message']['content']
+    except Exception as e:
         print(f"[OllamaError] {e!r} — falling back to defaults for {response_model.__name__}")
+        return with_defaults(response_model, {}, RepairNote(defaulted=list(response_model.model_fields)))
 
-        # Hard‐coded defaults per model
-        name = response_model.__name__
-        if name == "ResumeAnalysis":
-            return ResumeAnalysis(
-                name="",
-                match_score=0,
-                strengths=[],
-                weaknesses=[],
-                missing_keywords=[],
-                score_breakdown={}
-            )
-        elif name == "NewsAnalysis":
-            return NewsAnalysis(
-                is_fake=False,
-                confidence=0,
-                reasons=[],
-                related_entities=[],
-                source_credibility=0,
-                supporting_evidence=[]
-            )
-        elif name == "CodeAnalysis":
-            return CodeAnalysis(
-                overall_score=0,
-                bugs=[],
-                optimizations=[],
-                security_issues=[],
-                complexity_analysis={}
-            )
-        elif name == "QAResponse":
-            return QAResponse(
-                answer="Unable to generate response",
-                confidence=0,
-                sources=[],
-                related_questions=[]
-            )
-        elif name == "EmailContent":
-            return EmailContent(
-                subject="",
-                body="",
-                tone_score=0,
-                clarity_score=0
-            )
-        elif name == "MeetingProposal":
-            return MeetingProposal(
-                suggested_time="",
-                agenda_items=[],
-                duration_optimization="",
-                follow_up_actions=""
-            )
-        else:
-            # Generic fallback: instantiate with no args (will still error if model has required fields!)
-            return response_model()
+    try:
+        with tracing.span("validate", schema=response_model.__name__):
+            return response_model.model_validate_json(content)
+    except ValidationError as e:
+        print(f"[OllamaError] {e!r} — salvaging {response_model.__name__}")
+        return repair_response(prompt, content, response_model, model)
+
+def split_fields(data: Dict, response_model: Type[BaseModel], incomplete: Set[str]) -> Tuple[Dict, List[str]]:
+    """Separate the fields that validate on their own from those missing, invalid or cut off."""
+    bad = set(incomplete)
+    try:
+        response_model.model_validate(data)
+    except ValidationError as e:
+        for err in e.errors():
+            if not err["loc"]:  # not an object at all
+                return {}, list(response_model.model_fields)
+            bad.add(err["loc"][0])
+    valid = {f: data[f] for f in response_model.model_fields if f in data and f not in bad}
+    return valid, [f for f in response_model.model_fields if f not in valid]
+
+@lru_cache(maxsize=64)
+def partial_model(response_model: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """A schema with just the given fields, so the follow-up can only produce those."""
+    return create_model(
+        f"{response_model.__name__}Missing",
+        **{f: (response_model.model_fields[f].annotation, ...) for f in fields},
+    )
+
+def ask_for_fields(prompt: str, valid: Dict, missing: List[str],
+                   response_model: Type[BaseModel], model: str) -> Dict:
+    """
+    Follow-up turn asking only for the missing fields. The original prompt is sent
+    unchanged as the first message so the server can reuse its cached prefix.
+    """
+    schema = partial_model(response_model, tuple(missing))
+    messages = [
+        {"role": "user", "content": prompt},
+        {"role": "assistant", "content": json.dumps(valid)},
+        {"role": "user", "content": REASK_TEMPLATE.format(fields=", ".join(missing))},
+    ]
+    try:
+        with tracing.span("llm", model=model, schema=schema.__name__, reask=len(missing)):
+            response = _chat(model=model, messages=messages, format=schema.model_json_schema())
+    except Exception as e:
+        print(f"[OllamaError] {e!r} — re-ask for {missing} failed")
+        return {}
+    data, incomplete = salvage_json(response['message']['content'])
+    extra, _ = split_fields(data, schema, incomplete)
+    return extra
+
+def repair_response(prompt: str, content: str, response_model: Type[BaseModel], model: str) -> BaseModel:
+    """Keep the valid part of a failed generation and top it up with a small follow-up call."""
+    with tracing.span("salvage", schema=response_model.__name__, chars=len(content)):
+        data, incomplete = salvage_json(content)
+        valid, missing = split_fields(data, response_model, incomplete)
+    note = RepairNote(salvaged=list(valid))
+    # With nothing salvaged a follow-up would be a full retry; fall back instead
+    if valid and missing:
+        extra = ask_for_fields(prompt, valid, missing, response_model, model)
+        valid.update(extra)
+        note.reasked = list(extra)
+    note.defaulted = [f for f in response_model.model_fields if f not in valid]
+    return with_defaults(response_model, valid, note)
+
+def with_defaults(response_model: Type[BaseModel], fields: Dict, note: RepairNote) -> BaseModel:
+    """Fill whatever is still missing with safe defaults and flag the result."""
+    result = fallback(response_model)
+    if fields:
+        result = response_model.model_validate({**result.model_dump(), **fields})
+    if isinstance(result, AgentResult):
+        result._repair = note
+    return result
+
+def fallback(response_model: Type[BaseModel]) -> BaseModel:
+    """Hard‐coded defaults per model"""
+    name = response_model.__name__
+    if name == "ResumeAnalysis":
+        return ResumeAnalysis(
+            name="",
+            contact_info="",
+            experience_summary="",
+            match_score=0,
+            is_good_fit=False,
+            strengths=[],
+            weaknesses=[],
+            missing_keywords=[],
+            score_breakdown={},
+            detailed_report=""
+        )
+    elif name == "NewsAnalysis":
+        return NewsAnalysis(
+            is_fake=False,
+            confidence=0,
+            reasons=[],
+            related_entities=[],
+            source_credibility=0,
+            supporting_evidence=[]
+        )
+    elif name == "CodeAnalysis":
+        return CodeAnalysis(
+            overall_score=0,
+            bugs=[],
+            optimizations=[],
+            security_issues=[],
+            complexity_analysis={}
+        )
+    elif name == "FileAnalysis":
+        return FileAnalysis(
+            overall_score=0,
+            bugs=[],
+            optimizations=[],
+            security_issues=[],
+            complexity_analysis={},
+            summary=""
+        )
+    elif name == "RepoSummary":
+        return RepoSummary(
+            overview="",
+            architecture=[],
+            key_risks=[],
+            overall_score=0
+        )
+    elif name == "QAResponse":
+        return QAResponse(
+            answer="Unable to generate response",
+            confidence=0,
+            sources=[],
+            related_questions=[]
+        )
+    elif name == "EmailContent":
+        return EmailContent(
+            subject="",
+            body="",
+            tone_score=0,
+            clarity_score=0
+        )
+    elif name == "MeetingProposal":
+        return MeetingProposal(
+            suggested_time="",
+            agenda_items=[],
+            duration_optimization="",
+            follow_up_actions=""
+        )
+    elif name == "MeetingAgenda":
+        return MeetingAgenda(
+            agenda_items=[],
+            duration_optimization="",
+            follow_up_actions=""
+        )
+    else:
+        # Generic fallback: instantiate with no args (will still error if model has required fields!)
+        return response_model()
@@ -0,0 +1,142 @@
+# utils/qa_cache.py
+import re
+import hashlib
+import numpy as np
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from .schemas import QAResponse
+
+# Hashed feature space for question vectors
+DIM = 2048
+# Minimum cosine similarity to reuse a cached answer
+THRESHOLD = 0.82
+# Cached questions kept per document
+MAX_ENTRIES = 200
+
+STOPWORDS = frozenset("""
+a an the is are was were be been of in on at to for from by with and or this that these those it its
+document doc file text pdf me please tell can could would you i we do does did what whats which
+""".split())
+
+NEGATIONS = frozenset("not no never none nothing without nor cannot".split())
+
+# Phrasings that ask for the same thing collapse to one canonical token
+CANONICAL = {
+    "summarize": "summary", "summarise": "summary", "summary": "summary", "overview": "summary",
+    "gist": "summary", "about": "summary", "tldr": "summary", "main": "summary", "purpose": "summary",
+    "describe": "summary", "explain": "summary",
+    "who": "who", "author": "who", "wrote": "who", "written": "who",
+    "when": "when", "date": "when", "dated": "when",
+    "conclusion": "conclusion", "conclude": "conclusion", "concludes": "conclusion", "ending": "conclusion",
+    "end": "conclusion", "ends": "conclusion",
+    "character": "character", "characters": "character", "protagonist": "character",
+}
+
+
+def normalize_question(question: str) -> List[str]:
+    """Lowercase, drop punctuation and filler words, and map synonyms to canonical terms."""
+    words = re.findall(r"[a-z0-9]+", question.lower())
+    terms = [CANONICAL.get(w, w) for w in words if w not in STOPWORDS]
+    return terms or words
+
+
+def key_terms(question: str) -> FrozenSet[str]:
+    """
+    Terms two questions must share exactly to be treated as the same question:
+    numbers, names and single-letter identifiers, and whether it is negated.
+    Similar wording alone is not enough ("price of item A" vs "item B").
+    """
+    text = re.sub(r"n['’]t\b", " not", question)
+    text = re.sub(r"['’](s|re|ll|ve|d|m)\b", "", text)  # what's, they're, ...
+    words = re.findall(r"[A-Za-z0-9]+", text)
+    terms = set()
+    for i, word in enumerate(words):
+        lower = word.lower()
+        if any(c.isdigit() for c in word):
+            terms.add(lower)
+        elif lower in NEGATIONS:
+            terms.add("not")
+        elif i > 0 and word[0].isupper() and word != "I":
+            terms.add(lower)  # a capitalized word mid-question: a name or an identifier
+        elif len(word) == 1 and lower not in ("a", "i"):
+            terms.add(lower)
+    return frozenset(terms)
+
+
+def match_key(question: str) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+    """
+    Key terms plus the set of canonical content terms. Both must be equal for a cache
+    hit: one differing content word ("keep" vs "break", "before" vs "after") can flip
+    the answer while barely moving the similarity score.
+    """
+    return key_terms(question), frozenset(normalize_question(question))
+
+
+def _feature(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=4).digest(), "little") % DIM
+
+
+def embed(question: str) -> np.ndarray:
+    """L2-normalized hashed bag of terms and character trigrams."""
+    vec = np.zeros(DIM, dtype=np.float32)
+    for term in normalize_question(question):
+        vec[_feature("w:" + term)] += 2.0
+        padded = f"#{term}#"
+        for i in range(len(padded) - 2):
+            vec[_feature("c:" + padded[i:i + 3])] += 0.5
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+def document_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", "ignore")).hexdigest()
+
+
+class DocumentCache:
+    """Question vectors and answers for one version of one document."""
+
+    def __init__(self, doc_hash: str):
+        self.doc_hash = doc_hash
+        self.questions: List[str] = []
+        self.answers: List[QAResponse] = []
+        self.keys: List[Tuple[FrozenSet[str], FrozenSet[str]]] = []
+        self.matrix = np.zeros((0, DIM), dtype=np.float32)
+
+    def lookup(self, question: str, threshold: float = THRESHOLD) -> Optional[Tuple[QAResponse, str, float]]:
+        """
+        Return (answer, cached question, similarity) for the closest cached question
+        with the same key and content terms; similarity only picks among those.
+        """
+        keys = match_key(question)
+        same = np.array([k == keys for k in self.keys], dtype=bool)
+        if not same.any():
+            return None
+        scores = np.where(same, self.matrix @ embed(question), -1.0)
+        best = int(np.argmax(scores))
+        if scores[best] < threshold:
+            return None
+        return self.answers[best], self.questions[best], float(scores[best])
+
+    def add(self, question: str, answer: QAResponse):
+        self.questions.append(question)
+        self.answers.append(answer)
+        self.keys.append(match_key(question))
+        self.matrix = np.vstack([self.matrix, embed(question)[None, :]])
+        if len(self.questions) > MAX_ENTRIES:
+            self.questions = self.questions[-MAX_ENTRIES:]
+            self.answers = self.answers[-MAX_ENTRIES:]
+            self.keys = self.keys[-MAX_ENTRIES:]
+            self.matrix = self.matrix[-MAX_ENTRIES:]
+
+
+class QACache:
+    """Per-document answer caches, keyed by document name and invalidated when its content hash changes."""
+
+    def __init__(self):
+        self._docs: Dict[str, DocumentCache] = {}
+
+    def for_document(self, name: str, doc_hash: str) -> DocumentCache:
+        cache = self._docs.get(name)
+        if cache is None or cache.doc_hash != doc_hash:
+            cache = DocumentCache(doc_hash)
+            self._docs[name] = cache
+        return cache
@@ -3,11 +3,15 @@ import PyPDF2
 from docx import Document
 from io import BytesIO
 import base64
+import hashlib
+from typing import List
 from fpdf import FPDF
 from .schemas import ResumeAnalysis
 from .ollama_handler import structured_ollama_call
+from . import storage, jobs, tracing, ui
 
 
+@tracing.traced("parse")
 def parse_resume(file) -> str:
     """Extract text from uploaded PDF or DOCX file."""
     if file.type == "application/pdf":
@@ -21,7 +25,8 @@ def parse_resume(file) -> str:
 
 def analyze_resume(jd: str, resume_text: str) -> ResumeAnalysis:
     """Call the LLM to analyze resume against the job description and return structured data."""
-    prompt = f"""
+    with tracing.span("prompt"):
+        prompt = f"""
 Analyze this resume against the job description.
 
 Job Description:
@@ -49,6 +54,16 @@ Return a JSON object with the following fields:
     )
 
 
+def _analyze_job(ctx, user, jd: str, name: str, text: str) -> ResumeAnalysis:
+    """Background job: analyze one resume, reusing stored results when possible."""
+    ctx.progress(0.1, "Analyzing…")
+    result, _ = storage.reuse_or_run(
+        user, "resume", storage.hash_input(jd, text),
+        ResumeAnalysis, lambda: analyze_resume(jd, text), title=name
+    )
+    return result
+
+
 def generate_pdf(report: ResumeAnalysis) -> bytes:
     """Generate a PDF report from the ResumeAnalysis data, sanitizing Unicode to Latin-1, returning bytes."""
     def safe(text: str) -> str:
@@ -95,6 +110,35 @@ def generate_pdf(report: ResumeAnalysis) -> bytes:
     return pdf_str.encode('latin-1')
 
 
+def content_hash(data) -> str:
+    """Short content hash for a resume upload (bytes) or a job description (str)."""
+    if isinstance(data, str):
+        data = " ".join(data.split()).encode("utf-8")
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def submit_missing(jd_hashes: List[str], resume_hashes: List[str]) -> int:
+    """Queue analyses for matrix cells that are neither scored nor already running."""
+    matrix = st.session_state.resume_matrix
+    pending = st.session_state.resume_jobs
+    pool = st.session_state.resume_pool
+    user = st.session_state.auth['user']
+    queued = 0
+    for jd_hash in jd_hashes:
+        jd = st.session_state.resume_jds[jd_hash]
+        for resume_hash in resume_hashes:
+            cell = (jd_hash, resume_hash)
+            if cell in matrix or cell in pending:
+                continue
+            resume = pool[resume_hash]
+            pending[cell] = jobs.submit(
+                _analyze_job, user, jd["text"], resume["name"], resume["text"],
+                label=f"{resume['name']} × {jd['label']}", owner=user
+            )
+            queued += 1
+    return queued
+
+
 def show_ui():
     st.header("Resume Analyzer 📄")
     jd = st.text_area("Job Description", height=150)
@@ -102,29 +146,92 @@ def show_ui():
         "Upload Resumes", type=["pdf", "docx"], accept_multiple_files=True
     )
 
-    if "resume_results" not in st.session_state:
-        st.session_state.resume_results = {}
-
-    if st.button("Analyze") and jd and resumes:
-        for resume in resumes:
-            if resume.name not in st.session_state.resume_results:
-                with st.spinner(f"Analyzing {resume.name}…"):
-                    text = parse_resume(resume)
-                    st.session_state.resume_results[resume.name] = analyze_resume(jd, text)
-
-    for name, result in st.session_state.resume_results.items():
-        with st.expander(name, expanded=True):
-            # Display key candidate info
-            st.subheader(result.name)
-            st.write(f"📞 Contact: {result.contact_info}")
-            st.write(f"🧑‍💼 Experience: {result.experience_summary}")
-            fit_label = "✅ Good Fit" if result.is_good_fit else "❌ Not a Good Fit"
-            st.metric("Overall Fit", fit_label)
-            st.write(f"**Match Score:** {result.match_score}/100")
-
-            # Download detailed PDF report
-            pdf_bytes = generate_pdf(result)
-            b64 = base64.b64encode(pdf_bytes).decode()
-            href = f'<a href="data:application/octet-stream;base64,{b64}" download="{name}_analysis.pdf">📥 Download Detailed Report (PDF)</a>'
-            st.markdown(href, unsafe_allow_html=True)
-            st.markdown("---")
+    if "resume_pool" not in st.session_state:
+        st.session_state.resume_pool = {}  # resume hash -> {name, text}
+    if "resume_jds" not in st.session_state:
+        st.session_state.resume_jds = {}  # jd hash -> {label, text}
+    if "resume_matrix" not in st.session_state:
+        st.session_state.resume_matrix = {}  # (jd hash, resume hash) -> ResumeAnalysis
+    if "resume_jobs" not in st.session_state:
+        st.session_state.resume_jobs = {}  # (jd hash, resume hash) -> job id
+    pool = st.session_state.resume_pool
+    jds = st.session_state.resume_jds
+    matrix = st.session_state.resume_matrix
+
+    # Register uploads by content, so renamed copies and re-uploads are parsed and scored once
+    current: List[str] = []
+    for resume in resumes or []:
+        resume_hash = content_hash(resume.getvalue())
+        if resume_hash not in pool:
+            pool[resume_hash] = {"name": resume.name, "text": parse_resume(resume)}
+        if resume_hash not in current:
+            current.append(resume_hash)
+    if resumes and len(current) < len(resumes):
+        st.caption(f"{len(resumes) - len(current)} duplicate upload(s) skipped")
+    resume_hashes = current or list(pool)
+
+    if st.button("Analyze") and jd.strip() and resume_hashes:
+        jd_hash = content_hash(jd)
+        if jd_hash not in jds:
+            jds[jd_hash] = {"label": f"JD {len(jds) + 1}: {jd.strip()[:40]}", "text": jd}
+        st.session_state.resume_compare = [jd_hash]
+        # Only cells missing for this JD are sent to the LLM
+        submit_missing([jd_hash], resume_hashes)
+
+    jobs.show_jobs(st.session_state.resume_jobs, matrix)
+
+    if jds:
+        compare_panel(resume_hashes)
+
+@st.fragment
+@ui.traced_fragment("Resume comparison")
+def compare_panel(resume_hashes: List[str]):
+    """Switching JDs or pages reruns only the comparison, not parsing and uploads."""
+    pool = st.session_state.resume_pool
+    jds = st.session_state.resume_jds
+    matrix = st.session_state.resume_matrix
+    selected = st.multiselect(
+        "Compare job descriptions", list(jds), key="resume_compare",
+        format_func=lambda h: jds[h]["label"],
+    )
+    missing = [
+        (h, r) for h in selected for r in resume_hashes
+        if (h, r) not in matrix and (h, r) not in st.session_state.resume_jobs
+    ]
+    if missing and st.button(f"Score {len(missing)} missing cell(s)"):
+        submit_missing(selected, resume_hashes)
+        st.rerun()
+
+    with tracing.span("render", items=len(resume_hashes) * len(selected)), ui.render_timer("Resume scores"):
+        # Side-by-side scores: one row per resume, one column per JD
+        table = {"Resume": [pool[r]["name"] for r in resume_hashes]}
+        for h in selected:
+            table[jds[h]["label"]] = [
+                matrix[(h, r)].match_score if (h, r) in matrix else None for r in resume_hashes
+            ]
+        st.dataframe(table, hide_index=True)
+
+        # Detailed reports render one page of scored resumes at a time
+        scored_hashes = [r for r in resume_hashes if any((h, r) in matrix for h in selected)]
+        for resume_hash in ui.paginate(scored_hashes, "resume_reports"):
+            name = pool[resume_hash]["name"]
+            scored = [(h, matrix[(h, resume_hash)]) for h in selected if (h, resume_hash) in matrix]
+            with st.expander(name, expanded=len(resume_hashes) == 1):
+                for jd_hash, result in scored:
+                    if len(selected) > 1:
+                        st.markdown(f"#### {jds[jd_hash]['label']}")
+                    # Display key candidate info
+                    st.subheader(result.name)
+                    ui.repair_notice(result)
+                    st.write(f"📞 Contact: {result.contact_info}")
+                    st.write(f"🧑‍💼 Experience: {result.experience_summary}")
+                    fit_label = "✅ Good Fit" if result.is_good_fit else "❌ Not a Good Fit"
+                    st.metric("Overall Fit", fit_label)
+                    st.write(f"**Match Score:** {result.match_score}/100")
+
+                    # Download detailed PDF report
+                    pdf_bytes = generate_pdf(result)
+                    b64 = base64.b64encode(pdf_bytes).decode()
+                    href = f'<a href="data:application/octet-stream;base64,{b64}" download="{name}_analysis.pdf">📥 Download Detailed Report (PDF)</a>'
+                    st.markdown(href, unsafe_allow_html=True)
+                    st.markdown("---")
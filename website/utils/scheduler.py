@@ -0,0 +1,364 @@
+# utils/scheduler.py
+import io
+import re
+import csv
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+# UI timezone labels mapped to IANA zones
+TIMEZONES = {
+    "UTC": "UTC",
+    "IST": "Asia/Kolkata",
+    "PST": "America/Los_Angeles",
+    "CET": "Europe/Berlin",
+}
+
+# Windows zone names used as TZIDs by Outlook/Exchange exports
+WINDOWS_ZONES = {
+    "UTC": "UTC",
+    "GMT Standard Time": "Europe/London",
+    "W. Europe Standard Time": "Europe/Berlin",
+    "Romance Standard Time": "Europe/Paris",
+    "Central Europe Standard Time": "Europe/Budapest",
+    "Central European Standard Time": "Europe/Warsaw",
+    "India Standard Time": "Asia/Kolkata",
+    "China Standard Time": "Asia/Shanghai",
+    "Singapore Standard Time": "Asia/Singapore",
+    "Tokyo Standard Time": "Asia/Tokyo",
+    "AUS Eastern Standard Time": "Australia/Sydney",
+    "Eastern Standard Time": "America/New_York",
+    "Central Standard Time": "America/Chicago",
+    "Mountain Standard Time": "America/Denver",
+    "Pacific Standard Time": "America/Los_Angeles",
+}
+WEEKDAYS = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+# Safety cap on expanded occurrences per recurring event
+MAX_OCCURRENCES = 10_000
+
+Interval = Tuple[datetime, datetime]  # aware datetimes, start < end
+
+
+class Slot(NamedTuple):
+    start: datetime
+    end: datetime
+    busy: Tuple[str, ...]  # attendees with a conflict (empty when everyone is free)
+
+
+def resolve_zone(name: str) -> Optional[ZoneInfo]:
+    """Zone for a UI label, IANA name or Windows zone name; None if unknown."""
+    name = name.strip().strip('"')
+    try:
+        return ZoneInfo(TIMEZONES.get(name) or WINDOWS_ZONES.get(name) or name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+def get_zone(name: str) -> ZoneInfo:
+    return resolve_zone(name) or ZoneInfo("UTC")
+
+
+# Parsing
+
+def _unfold(text: str) -> List[str]:
+    """Undo ICS line folding (continuation lines start with a space or tab)."""
+    lines: List[str] = []
+    for line in text.splitlines():
+        if line[:1] in (" ", "\t") and lines:
+            lines[-1] += line[1:]
+        elif line:
+            lines.append(line)
+    return lines
+
+
+def _parse_ics_time(value: str, params: Dict[str, str], default_tz: ZoneInfo,
+                    warnings: List[str]) -> Tuple[datetime, bool]:
+    """Return (aware datetime, is_all_day) for a DTSTART/DTEND value."""
+    if params.get("VALUE") == "DATE" or re.fullmatch(r"\d{8}", value):
+        d = datetime.strptime(value, "%Y%m%d")
+        return d.replace(tzinfo=default_tz), True
+    if value.endswith("Z"):
+        return datetime.strptime(value, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc), False
+    tz = default_tz
+    if "TZID" in params:
+        tz = resolve_zone(params["TZID"])
+        if tz is None:
+            note = f"Unknown timezone {params['TZID']!r}; its times were read as {default_tz.key}."
+            if note not in warnings:
+                warnings.append(note)
+            tz = default_tz
+    return datetime.strptime(value, "%Y%m%dT%H%M%S").replace(tzinfo=tz), False
+
+
+def _parse_rrule(value: str) -> Dict[str, str]:
+    return dict(part.split("=", 1) for part in value.split(";") if "=" in part)
+
+
+def _until(value: str, tz) -> datetime:
+    """First instant after UNTIL, which is inclusive: the next second, or the next day for a date."""
+    if value.endswith("Z"):
+        return datetime.strptime(value, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc) + timedelta(seconds=1)
+    if "T" in value:
+        return datetime.strptime(value, "%Y%m%dT%H%M%S").replace(tzinfo=tz) + timedelta(seconds=1)
+    return datetime.strptime(value, "%Y%m%d").replace(tzinfo=tz) + timedelta(days=1)
+
+
+def expand_rrule(start: datetime, rule: Dict[str, str], range_end: datetime) -> Optional[List[datetime]]:
+    """
+    Occurrence starts of a DAILY or WEEKLY rule (INTERVAL, COUNT, UNTIL, plain BYDAY)
+    up to range_end, in the event's own wall-clock time. None if the rule is unsupported.
+    """
+    freq = rule.get("FREQ")
+    byday = [d for d in rule.get("BYDAY", "").split(",") if d]
+    if freq not in ("DAILY", "WEEKLY") or any(d not in WEEKDAYS for d in byday) \
+            or set(rule) - {"FREQ", "INTERVAL", "COUNT", "UNTIL", "BYDAY", "WKST"}:
+        return None
+    interval = max(1, int(rule.get("INTERVAL", "1")))
+    count = int(rule["COUNT"]) if "COUNT" in rule else None
+    until = _until(rule["UNTIL"], start.tzinfo) if "UNTIL" in rule else None
+    days = sorted(WEEKDAYS.index(d) for d in byday) or None
+    if freq == "WEEKLY":
+        step = timedelta(weeks=interval)
+        period_start = start - timedelta(days=start.weekday())
+        offsets = days or [start.weekday()]
+    else:
+        step = timedelta(days=interval)
+        period_start = start
+        offsets = [0]
+    occurrences: List[datetime] = []
+    while len(occurrences) < MAX_OCCURRENCES:
+        for offset in offsets:
+            when = period_start + timedelta(days=offset) if freq == "WEEKLY" else period_start
+            # Bounds first: a BYDAY that never matches must still stop at range_end
+            if (until and when >= until) or when >= range_end or (count is not None and len(occurrences) >= count):
+                return occurrences
+            if when < start or (freq == "DAILY" and days and when.weekday() not in days):
+                continue
+            occurrences.append(when)
+        period_start += step
+    return occurrences
+
+
+def parse_ics(text: str, default_tz: ZoneInfo, range_end: Optional[datetime] = None) -> Tuple[List[Interval], List[str]]:
+    """
+    Extract busy intervals from an ICS calendar. Floating times use default_tz.
+    Transparent and cancelled events are ignored. DAILY and WEEKLY recurrences are
+    expanded up to range_end (default: a year from now), honouring EXDATE and moved
+    instances; other rules only block their first occurrence.
+    Returns (intervals, warnings) so the caller can tell the user what was approximated.
+    """
+    if range_end is None:
+        range_end = datetime.now(timezone.utc) + timedelta(days=365)
+    warnings: List[str] = []
+    events: List[Dict[str, List[Tuple[str, Dict[str, str]]]]] = []
+    event: Optional[Dict[str, List[Tuple[str, Dict[str, str]]]]] = None
+    for line in _unfold(text):
+        if line == "BEGIN:VEVENT":
+            event = {}
+            continue
+        if line == "END:VEVENT":
+            if event is not None and "DTSTART" in event:
+                events.append(event)
+            event = None
+            continue
+        if event is None or ":" not in line:
+            continue
+        head, value = line.split(":", 1)
+        name, *raw_params = head.split(";")
+        params = dict(p.split("=", 1) for p in raw_params if "=" in p)
+        event.setdefault(name.upper(), []).append((value.strip(), params))
+
+    def first(ev, key, default=""):
+        return ev[key][0][0] if key in ev else default
+
+    # Instances moved or edited individually replace their slot in the series
+    moved: Dict[str, set] = {}
+    for ev in events:
+        if "RECURRENCE-ID" in ev:
+            value, params = ev["RECURRENCE-ID"][0]
+            moved.setdefault(first(ev, "UID"), set()).add(_parse_ics_time(value, params, default_tz, warnings)[0])
+
+    intervals: List[Interval] = []
+    for ev in events:
+        if first(ev, "TRANSP") == "TRANSPARENT" or first(ev, "STATUS") == "CANCELLED":
+            continue
+        start, all_day = _parse_ics_time(*ev["DTSTART"][0], default_tz, warnings)
+        if "DTEND" in ev:
+            end, _ = _parse_ics_time(*ev["DTEND"][0], default_tz, warnings)
+        else:
+            end = start + (timedelta(days=1) if all_day else timedelta(0))
+        if end <= start:
+            continue
+        starts = [start]
+        if "RRULE" in ev and "RECURRENCE-ID" not in ev:
+            rule = _parse_rrule(first(ev, "RRULE"))
+            expanded = expand_rrule(start, rule, range_end)
+            if expanded is None:
+                warnings.append(f"\"{first(ev, 'SUMMARY', 'Untitled')}\" repeats with an unsupported rule "
+                                f"({first(ev, 'RRULE')}); only its first occurrence blocks time.")
+            else:
+                skip = set(moved.get(first(ev, "UID"), set()))
+                for value, params in ev.get("EXDATE", []):
+                    for part in value.split(","):
+                        skip.add(_parse_ics_time(part, params, default_tz, warnings)[0])
+                starts = [s for s in expanded if s not in skip]
+        intervals.extend((s, s + (end - start)) for s in starts)
+    return intervals, warnings
+
+
+def _parse_table_time(value: str, tz: ZoneInfo) -> datetime:
+    dt = datetime.fromisoformat(value.strip())
+    return dt if dt.tzinfo else dt.replace(tzinfo=tz)
+
+
+def parse_table(text: str, default_tz: ZoneInfo) -> Tuple[Dict[str, List[Interval]], List[str]]:
+    """
+    Parse a busy-time CSV with columns attendee, start, end and optional timezone.
+    Times are ISO 8601; naive times use the row's timezone, else default_tz.
+    Returns (busy times per attendee, warnings).
+    """
+    busy: Dict[str, List[Interval]] = {}
+    warnings: List[str] = []
+    reader = csv.DictReader(io.StringIO(text))
+    for raw in reader:
+        row = {k.strip().lower(): (v or "").strip() for k, v in raw.items() if k}
+        if not row.get("attendee") or not row.get("start") or not row.get("end"):
+            continue
+        tz = default_tz
+        if row.get("timezone"):
+            tz = resolve_zone(row["timezone"])
+            if tz is None:
+                note = f"Unknown timezone {row['timezone']!r}; its times were read as {default_tz.key}."
+                if note not in warnings:
+                    warnings.append(note)
+                tz = default_tz
+        start, end = _parse_table_time(row["start"], tz), _parse_table_time(row["end"], tz)
+        if end > start:
+            busy.setdefault(row["attendee"], []).append((start, end))
+    return busy, warnings
+
+
+# Solving
+
+def working_windows(start_day: date, days: int, tz: ZoneInfo, day_start: time, day_end: time,
+                    weekdays_only: bool = True) -> List[Interval]:
+    """Working-hour windows for each day of the search range, in the meeting timezone."""
+    windows = []
+    for offset in range(days):
+        day = start_day + timedelta(days=offset)
+        if weekdays_only and day.weekday() >= 5:
+            continue
+        start = datetime.combine(day, day_start, tzinfo=tz)
+        end = datetime.combine(day, day_end, tzinfo=tz)
+        if end > start:
+            windows.append((start, end))
+    return windows
+
+
+def sweep(busy: Dict[str, Iterable[Interval]], window: Interval) -> List[Tuple[datetime, datetime, Tuple[str, ...]]]:
+    """
+    Sweep-line over every attendee's busy intervals clipped to `window`.
+    Returns consecutive segments covering the window with the attendees busy in each.
+    Runs in O(n log n) for n intervals.
+    """
+    lo, hi = window
+    events: List[Tuple[datetime, int, str]] = []
+    for attendee, intervals in busy.items():
+        for start, end in intervals:
+            start, end = max(start, lo), min(end, hi)
+            if start < end:
+                # Ends sort before starts at the same instant so back-to-back meetings leave no gap
+                events.append((start, 1, attendee))
+                events.append((end, 0, attendee))
+    events.sort()
+    active: Dict[str, int] = {}
+    segments = []
+    cursor = lo
+    for when, is_start, attendee in events:
+        if when > cursor:
+            segments.append((cursor, when, tuple(sorted(a for a, n in active.items() if n))))
+            cursor = when
+        active[attendee] = active.get(attendee, 0) + (1 if is_start else -1)
+    if cursor < hi:
+        segments.append((cursor, hi, tuple(sorted(a for a, n in active.items() if n))))
+    return segments
+
+
+def _merge(segments: Iterable[Tuple[datetime, datetime, Tuple[str, ...]]]) -> List[List]:
+    """Merge adjacent segments that have the same busy set."""
+    merged: List[List] = []
+    for start, end, who in segments:
+        if merged and merged[-1][2] == who and merged[-1][1] == start:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end, who])
+    return merged
+
+
+def find_slots(busy: Dict[str, List[Interval]], windows: List[Interval], duration: timedelta,
+               limit: int = 5, step: timedelta = timedelta(minutes=15)) -> List[Slot]:
+    """
+    Earliest slots of `duration` inside the windows where everyone is free. If fewer than
+    `limit` exist, fill up with the slots that have the fewest conflicting attendees.
+    One sweep covers the whole search range; windows then walk its segments in order.
+    """
+    if not windows:
+        return []
+    windows = sorted(windows)
+    segments = sweep(busy, (windows[0][0], windows[-1][1]))
+    free: List[Slot] = []
+    per_window: List[Tuple[Interval, List[List]]] = []
+    i = 0
+    for lo, hi in windows:
+        while i < len(segments) and segments[i][1] <= lo:
+            i += 1
+        j = i
+        clipped = []
+        while j < len(segments) and segments[j][0] < hi:
+            start, end, who = segments[j]
+            clipped.append((max(start, lo), min(end, hi), who))
+            j += 1
+        merged = _merge(clipped)
+        per_window.append(((lo, hi), merged))
+        for start, end, who in merged:
+            slot_start = _align(start, step)
+            if not who and slot_start + duration <= end:
+                free.append(Slot(slot_start, slot_start + duration, ()))
+    if len(free) >= limit:
+        return free[:limit]
+    partial = [
+        slot
+        for window, merged in per_window
+        for slot in _partial_slots(merged, window, duration, step)
+        if slot.busy
+    ]
+    partial.sort(key=lambda s: (len(s.busy), s.start))
+    return free + partial[:limit - len(free)]
+
+
+def _align(when: datetime, step: timedelta) -> datetime:
+    """Round up to the next step boundary (e.g. quarter hour)."""
+    seconds = int(step.total_seconds())
+    offset = (when.minute * 60 + when.second) % seconds
+    if offset or when.microsecond:
+        when = when.replace(second=0, microsecond=0) + timedelta(seconds=seconds - offset + when.second)
+    return when
+
+
+def _partial_slots(merged: List[List], window: Interval, duration: timedelta, step: timedelta) -> List[Slot]:
+    """Candidate slots at step boundaries, tagged with everyone busy at any point during them."""
+    slots = []
+    start = _align(window[0], step)
+    i = 0
+    while start + duration <= window[1]:
+        end = start + duration
+        while i < len(merged) and merged[i][1] <= start:
+            i += 1
+        who = set()
+        j = i
+        while j < len(merged) and merged[j][0] < end:
+            who.update(merged[j][2])
+            j += 1
+        slots.append(Slot(start, end, tuple(sorted(who))))
+        start += step
+    return slots
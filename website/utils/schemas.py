@@ -1,8 +1,29 @@
 # utils/schemas.py
-from pydantic import BaseModel
+from dataclasses import dataclass, field
+from pydantic import BaseModel, PrivateAttr
 from typing import Dict, List, Optional
 
-class ResumeAnalysis(BaseModel):
+@dataclass
+class RepairNote:
+    """How a result was put back together after the model's output failed validation."""
+    salvaged: List[str] = field(default_factory=list)   # kept from the broken output
+    reasked: List[str] = field(default_factory=list)    # filled by a follow-up request
+    defaulted: List[str] = field(default_factory=list)  # still missing, safe defaults used
+
+class AgentResult(BaseModel):
+    """Base for LLM results. The repair note is private, so it never reaches the JSON schema."""
+    _repair: Optional[RepairNote] = PrivateAttr(default=None)
+
+    @property
+    def repair(self) -> Optional[RepairNote]:
+        return self._repair
+
+    @property
+    def has_placeholders(self) -> bool:
+        """True if some fields are fallback defaults; such results must not be reused."""
+        return bool(self._repair and self._repair.defaulted)
+
+class ResumeAnalysis(AgentResult):
     name: str
     contact_info: str
     experience_summary: str
@@ -14,7 +35,7 @@ class ResumeAnalysis(BaseModel):
     score_breakdown: Dict[str, float]
     detailed_report: str
 
-class NewsAnalysis(BaseModel):
+class NewsAnalysis(AgentResult):
     is_fake: bool
     confidence: int
     reasons: List[str]
@@ -28,27 +49,41 @@ class CodeBug(BaseModel):
     line_number: Optional[int]
     fix_suggestion: str
 
-class CodeAnalysis(BaseModel):
+class CodeAnalysis(AgentResult):
     overall_score: int
     bugs: List[CodeBug]
     optimizations: List[str]
     security_issues: List[str]
     complexity_analysis: dict
 
-class QAResponse(BaseModel):
+class FileAnalysis(CodeAnalysis):
+    summary: str  # what the module does and exposes, passed on to the files importing it
+
+class RepoSummary(AgentResult):
+    overview: str
+    architecture: List[str]
+    key_risks: List[str]
+    overall_score: int
+
+class QAResponse(AgentResult):
     answer: str
     confidence: int
     sources: List[str]
     related_questions: List[str]
 
-class EmailContent(BaseModel):
+class EmailContent(AgentResult):
     subject: str
     body: str
     tone_score: int
     clarity_score: int
 
-class MeetingProposal(BaseModel):
+class MeetingProposal(AgentResult):
     suggested_time: str
     agenda_items: List[str]
     duration_optimization: str
-    follow_up_actions: str
\ No newline at end of file
+    follow_up_actions: str
+
+class MeetingAgenda(AgentResult):
+    agenda_items: List[str]
+    duration_optimization: str
+    follow_up_actions: str
@@ -0,0 +1,261 @@
+# utils/storage.py
+import os
+import json
+import queue
+import sqlite3
+import hmac
+import hashlib
+import secrets
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple, Type
+from pydantic import BaseModel, ValidationError
+
+# Database location (override with AGENT_SUITE_DB)
+DB_PATH = os.environ.get(
+    "AGENT_SUITE_DB",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "agent_suite.db"),
+)
+POOL_SIZE = 8
+DEFAULT_PAGE_SIZE = 20
+# scrypt cost parameters for stored passwords
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username      TEXT PRIMARY KEY,
+    password_hash TEXT NOT NULL,
+    salt          TEXT NOT NULL,
+    created_at    TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS analyses (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    username    TEXT,
+    agent       TEXT NOT NULL,
+    input_hash  TEXT NOT NULL,
+    title       TEXT NOT NULL DEFAULT '',
+    result_json TEXT NOT NULL,
+    created_at  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_user_time ON analyses (username, id DESC);
+CREATE INDEX IF NOT EXISTS idx_analyses_user_agent_time ON analyses (username, agent, id DESC);
+CREATE INDEX IF NOT EXISTS idx_analyses_agent_input ON analyses (agent, input_hash, id DESC);
+CREATE INDEX IF NOT EXISTS idx_analyses_user_agent_input ON analyses (username, agent, input_hash);
+CREATE TABLE IF NOT EXISTS news_signatures (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    content_hash TEXT NOT NULL,
+    signature    BLOB NOT NULL,
+    result_json  TEXT NOT NULL,
+    created_at   TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS news_lsh (
+    band   INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    doc_id INTEGER NOT NULL,
+    PRIMARY KEY (band, bucket, doc_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_news_lsh_doc ON news_lsh (doc_id);
+"""
+
+
+class ConnectionPool:
+    """Small fixed-size pool of SQLite connections shared by all Streamlit sessions."""
+
+    def __init__(self, path: str, size: int = POOL_SIZE):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._pool: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=size)
+        for _ in range(size):
+            self._pool.put(self._connect())
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def close(self):
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide connection pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_PATH)
+    return _pool
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def hash_input(*parts: str) -> str:
+    """Stable hash of everything that goes into an LLM prompt."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8", "ignore"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+# Users
+
+def hash_password(password: str, salt: bytes) -> str:
+    return hashlib.scrypt(
+        password.encode("utf-8"), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P
+    ).hex()
+
+
+def create_user(username: str, password: str) -> bool:
+    """Insert a new user with a salted scrypt hash. Returns False if the username is already taken."""
+    salt = secrets.token_bytes(16)
+    with get_pool().connection() as conn:
+        try:
+            conn.execute(
+                "INSERT INTO users (username, password_hash, salt, created_at) VALUES (?, ?, ?, ?)",
+                (username, hash_password(password, salt), salt.hex(), _now()),
+            )
+            return True
+        except sqlite3.IntegrityError:
+            return False
+
+
+def verify_user(username: str, password: str) -> bool:
+    with get_pool().connection() as conn:
+        row = conn.execute(
+            "SELECT password_hash, salt FROM users WHERE username = ?", (username,)
+        ).fetchone()
+    if row is None:
+        return False
+    return hmac.compare_digest(row["password_hash"], hash_password(password, bytes.fromhex(row["salt"])))
+
+
+# Analyses
+
+def record_analysis(username: Optional[str], agent: str, input_hash: str,
+                    result: BaseModel, title: str = "") -> int:
+    """Store an analysis result and return its row id."""
+    with get_pool().connection() as conn:
+        cur = conn.execute(
+            "INSERT INTO analyses (username, agent, input_hash, title, result_json, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (username, agent, input_hash, title[:200], result.model_dump_json(), _now()),
+        )
+        return cur.lastrowid
+
+
+def record_reuse(username: str, agent: str, input_hash: str, result: BaseModel, title: str = ""):
+    """Add a reused result to a user's history, unless they already have it."""
+    with get_pool().connection() as conn:
+        conn.execute(
+            "INSERT INTO analyses (username, agent, input_hash, title, result_json, created_at) "
+            "SELECT ?, ?, ?, ?, ?, ? WHERE NOT EXISTS ("
+            "SELECT 1 FROM analyses WHERE username = ? AND agent = ? AND input_hash = ?)",
+            (username, agent, input_hash, title[:200], result.model_dump_json(), _now(),
+             username, agent, input_hash),
+        )
+
+
+def find_result(agent: str, input_hash: str, response_model: Type[BaseModel]) -> Optional[BaseModel]:
+    """Return the most recent stored result for the same agent and input, if any."""
+    with get_pool().connection() as conn:
+        row = conn.execute(
+            "SELECT result_json FROM analyses WHERE agent = ? AND input_hash = ? "
+            "ORDER BY id DESC LIMIT 1",
+            (agent, input_hash),
+        ).fetchone()
+    if row is None:
+        return None
+    try:
+        return response_model.model_validate_json(row["result_json"])
+    except ValidationError:
+        return None
+
+
+def reuse_or_run(username: Optional[str], agent: str, input_hash: str,
+                 response_model: Type[BaseModel], compute: Callable[[], BaseModel],
+                 title: str = "") -> Tuple[BaseModel, bool]:
+    """
+    Look up a previous result for this input before calling the LLM.
+    Returns (result, reused). Fresh results are recorded in the user's history,
+    unless parts of them are only fallback defaults.
+    """
+    cached = find_result(agent, input_hash, response_model)
+    if cached is not None:
+        if username:
+            record_reuse(username, agent, input_hash, cached, title)
+        return cached, True
+    result = compute()
+    if getattr(result, "has_placeholders", False):  # placeholder defaults are not worth reusing
+        return result, False
+    record_analysis(username, agent, input_hash, result, title)
+    return result, False
+
+
+def get_history(username: str, agent: Optional[str] = None,
+                page_size: int = DEFAULT_PAGE_SIZE, before_id: Optional[int] = None) -> List[Dict]:
+    """
+    Return one page of a user's history, newest first.
+    Pages are keyset-based: pass the last row's id as before_id to fetch the next page.
+    """
+    clauses = ["username = ?"]
+    params: list = [username]
+    if agent:
+        clauses.append("agent = ?")
+        params.append(agent)
+    if before_id is not None:
+        clauses.append("id < ?")
+        params.append(before_id)
+    params.append(page_size)
+    with get_pool().connection() as conn:
+        rows = conn.execute(
+            "SELECT id, agent, title, result_json, created_at FROM analyses "
+            f"WHERE {' AND '.join(clauses)} ORDER BY id DESC LIMIT ?",
+            params,
+        ).fetchall()
+    return [
+        {
+            "id": r["id"],
+            "agent": r["agent"],
+            "title": r["title"],
+            "result": json.loads(r["result_json"]),
+            "created_at": r["created_at"],
+        }
+        for r in rows
+    ]
+
+
+def count_history(username: str, agent: Optional[str] = None) -> int:
+    with get_pool().connection() as conn:
+        if agent:
+            row = conn.execute(
+                "SELECT COUNT(*) FROM analyses WHERE username = ? AND agent = ?", (username, agent)
+            ).fetchone()
+        else:
+            row = conn.execute("SELECT COUNT(*) FROM analyses WHERE username = ?", (username,)).fetchone()
+    return row[0]
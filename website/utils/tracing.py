@@ -0,0 +1,193 @@
+# utils/tracing.py
+import os
+import sys
+import json
+import time
+import threading
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Dict, Iterable, List, Optional
+
+# Default for the sidebar "Trace runs" toggle
+ENABLED_BY_DEFAULT = os.environ.get("AGENT_TRACE", "") not in ("", "0", "false")
+PROFILE_INTERVAL = 0.005  # seconds between stack samples
+PROFILE_MAX_SECONDS = 120
+PROFILE_IDLE_STOP = 5  # stop sampling after this many seconds with no open spans
+MAX_STACK_DEPTH = 40
+
+_current: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("agent_trace", default=None)
+
+
+class Trace:
+    """Timeline of spans for one request, exportable as Chrome trace JSON."""
+
+    def __init__(self, label: str, profile: bool = False):
+        self.label = label
+        self.origin = time.perf_counter_ns()
+        self.spans: List[Dict[str, Any]] = []
+        self.samples: List[Dict[str, Any]] = []
+        self.threads: Dict[int, str] = {}
+        self.open_spans: Dict[int, int] = {}  # thread id -> spans currently open
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        if profile:
+            self._sampler = threading.Thread(target=self._sample, name="trace-sampler", daemon=True)
+            self._sampler.start()
+
+    def _us(self, ns: int) -> float:
+        return (ns - self.origin) / 1000
+
+    def enter(self):
+        thread = threading.current_thread()
+        with self._lock:
+            self.threads[thread.ident] = thread.name
+            self.open_spans[thread.ident] = self.open_spans.get(thread.ident, 0) + 1
+
+    def add(self, name: str, start_ns: int, end_ns: int, args: Dict[str, Any]):
+        thread = threading.current_thread()
+        with self._lock:
+            self.open_spans[thread.ident] = self.open_spans.get(thread.ident, 1) - 1
+            self.spans.append({
+                "name": name,
+                "ts": self._us(start_ns),
+                "dur": (end_ns - start_ns) / 1000,
+                "tid": thread.ident,
+                "args": args,
+            })
+
+    def _sample(self):
+        """Record the stacks of threads that are inside a span of this trace."""
+        deadline = time.monotonic() + PROFILE_MAX_SECONDS
+        last_busy = time.monotonic()
+        while not self._stop.wait(PROFILE_INTERVAL) and time.monotonic() < deadline:
+            now = time.perf_counter_ns()
+            with self._lock:
+                busy = [tid for tid, n in self.open_spans.items() if n > 0]
+            if busy:
+                last_busy = time.monotonic()
+            elif time.monotonic() - last_busy > PROFILE_IDLE_STOP:
+                break
+            frames = sys._current_frames()
+            for tid in busy:
+                frame = frames.get(tid)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self.samples.append({"ts": self._us(now), "tid": tid, "stack": stack})
+
+    def stop(self):
+        """Stop the profiler, if any. Spans can still be added afterwards."""
+        self._stop.set()
+
+    def duration_ms(self) -> float:
+        with self._lock:
+            if not self.spans:
+                return 0.0
+            return max(s["ts"] + s["dur"] for s in self.spans) / 1000
+
+    def stage_totals(self) -> Dict[str, float]:
+        """Total milliseconds per span name."""
+        totals: Dict[str, float] = {}
+        with self._lock:
+            for s in self.spans:
+                totals[s["name"]] = totals.get(s["name"], 0.0) + s["dur"] / 1000
+        return totals
+
+    def hot_functions(self, top: int = 15) -> List[tuple]:
+        """(frame, sample count) for the frames most often on top of a sampled stack."""
+        return Counter(s["stack"][0] for s in list(self.samples) if s["stack"]).most_common(top)
+
+    def chrome_events(self, pid: int = 1) -> List[Dict[str, Any]]:
+        events = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": self.label}}]
+        with self._lock:
+            for tid, name in self.threads.items():
+                events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}})
+            for s in self.spans:
+                events.append({"name": s["name"], "cat": "stage", "ph": "X", "pid": pid,
+                               "tid": s["tid"], "ts": s["ts"], "dur": s["dur"], "args": s["args"]})
+        for s in list(self.samples):
+            events.append({"name": s["stack"][0] if s["stack"] else "?", "cat": "sample", "ph": "i", "s": "t",
+                           "pid": pid, "tid": s["tid"], "ts": s["ts"], "args": {"stack": s["stack"]}})
+        return events
+
+
+def to_chrome_json(traces: Iterable[Trace]) -> str:
+    """Chrome trace JSON (chrome://tracing, Perfetto) with one process row per trace."""
+    events = []
+    for pid, trace in enumerate(traces, 1):
+        events.extend(trace.chrome_events(pid))
+    return json.dumps({"traceEvents": events, "displayTimeUnit": "ms"})
+
+
+@contextmanager
+def use(trace: Optional[Trace]):
+    """Make `trace` the active trace for spans in this context (and jobs submitted from it)."""
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+def current() -> Optional[Trace]:
+    return _current.get()
+
+
+class _Span:
+    __slots__ = ("trace", "name", "args", "start")
+
+    def __init__(self, trace: Trace, name: str, args: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.trace.enter()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.add(self.name, self.start, time.perf_counter_ns(), self.args)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name: str, **args):
+    """Time a stage. Costs one context-variable lookup when no trace is active."""
+    trace = _current.get()
+    if trace is None:
+        return _NOOP
+    return _Span(trace, name, args)
+
+
+def traced(name: str):
+    """Decorator form of span()."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            trace = _current.get()
+            if trace is None:
+                return fn(*args, **kwargs)
+            with _Span(trace, name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,98 @@
+# utils/ui.py
+import math
+import time
+import streamlit as st
+from contextlib import contextmanager
+from functools import wraps
+from typing import List, Sequence, TypeVar
+from . import tracing
+
+T = TypeVar("T")
+
+DEFAULT_PAGE_SIZE = 5
+MAX_TRACES = 20
+
+
+def _set_page(key: str, page: int):
+    st.session_state[key] = page
+
+
+def paginate(items: Sequence[T], key: str, page_size: int = DEFAULT_PAGE_SIZE) -> List[T]:
+    """
+    Render pager controls and return only the items on the current page, so long
+    result lists cost the same to render no matter how many results exist.
+    """
+    state_key = f"{key}_page"
+    pages = max(1, math.ceil(len(items) / page_size))
+    page = min(max(st.session_state.get(state_key, 1), 1), pages)
+    if pages > 1:
+        cols = st.columns([1, 3, 1])
+        with cols[0]:
+            st.button("‹ Prev", key=f"{key}_prev", disabled=page <= 1,
+                      on_click=_set_page, args=(state_key, page - 1))
+        with cols[1]:
+            st.caption(f"Page {page} of {pages} · {len(items)} results")
+        with cols[2]:
+            st.button("Next ›", key=f"{key}_next", disabled=page >= pages,
+                      on_click=_set_page, args=(state_key, page + 1))
+    start = (page - 1) * page_size
+    return list(items[start:start + page_size])
+
+
+def record_trace(trace: tracing.Trace) -> List[tracing.Trace]:
+    """Keep the last MAX_TRACES traces in the session for the sidebar panel."""
+    traces = st.session_state.setdefault("traces", [])
+    traces.append(trace)
+    for old in traces[:-MAX_TRACES]:
+        old.stop()
+    del traces[:-MAX_TRACES]
+    return traces
+
+
+def traced_fragment(label: str):
+    """
+    Decorator for functions run as st.fragment. A fragment-only rerun never enters the
+    page's trace, so when tracing is on it opens its own; jobs submitted from it then
+    carry that trace. During a full rerun it is just a span in the page trace.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if tracing.current() is not None or not st.session_state.get("trace_enabled"):
+                with tracing.span("fragment", label=label):
+                    return fn(*args, **kwargs)
+            trace = tracing.Trace(label, profile=st.session_state.get("trace_profile", False))
+            try:
+                with tracing.use(trace), tracing.span("fragment", label=label):
+                    return fn(*args, **kwargs)
+            finally:
+                record_trace(trace)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def render_timer(label: str):
+    """Time a block of rendering, show it as a caption and keep it for the sidebar."""
+    started = time.perf_counter()
+    yield
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    st.session_state.setdefault("render_times", {})[label] = elapsed_ms
+    st.caption(f"⏱ {label} rendered in {elapsed_ms:.0f} ms")
+
+
+def repair_notice(result):
+    """Flag results rebuilt from a broken generation, naming the fields involved."""
+    note = getattr(result, "repair", None)
+    if not note:
+        return
+    if not note.salvaged and not note.reasked:
+        st.warning("⚠️ The model call failed; showing placeholder values.")
+        return
+    parts = [f"kept {', '.join(note.salvaged)}"]
+    if note.reasked:
+        parts.append(f"re-asked for {', '.join(note.reasked)}")
+    if note.defaulted:
+        parts.append(f"placeholders for {', '.join(note.defaulted)}")
+    show = st.warning if note.defaulted else st.info
+    show("🩹 Recovered from incomplete model output: " + "; ".join(parts))